@@ -6,66 +6,109 @@
 # python img_faces_detection.py --image images/people-005.jpg --full
 # python img_faces_detection.py --image images/people-006.jpg --full
 
+# To detect the faces of a whole folder (or glob) of images, without any window, to JSON lines:
+# python img_faces_detection.py --input images --output output/faces.jsonl
+# python img_faces_detection.py --input "archive/**/*.jpg" --output output/faces.jsonl --max-dim 1600 --workers 8
+
 # Import the necessary packages
 import argparse
+import os
+import sys
 import cv2
 
-# Construct the argument parser and parse the arguments
-ap = argparse.ArgumentParser()
-ap.add_argument("-fc", "--fclassifier", required = False, default="classifiers/haarcascade_frontalface_default.xml", help = "path to where the face cascade resides")
-ap.add_argument("-i", "--image", required = True, help = "path to where the image file resides")
-ap.add_argument("-f", "--full", required = False, action='store_true', help = "use full screen mode")
-args = vars(ap.parse_args())
-
-# Configure windows
-windowName = "Faces Detector"
-if (args["full"]):
-    cv2.namedWindow(windowName, cv2.WND_PROP_FULLSCREEN)
-    cv2.setWindowProperty(windowName, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-
-# Loading the image using OpenCV
-image = cv2.imread(args["image"])
-
-# Convert image to grayscale
-gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-# In order to build face recognition system, we use the built-in Haar cascade classifiers in OpenCV. 
-# Luckily, these classifiers have already been pre-trained to recognize faces!
-# OpenCV repository: https://github.com/opencv/opencv
-# data\haarcascades: This folder contains trained classifiers for detecting objects
-#                    of a particular type, e.g. faces (frontal, profile), pedestrians etc
-#
-# Building our own classifier is certainly outside the scope. But if we wanted to, we would need a
-# lot of “positive” and “negative” images. Positive images would contain images with faces, whereas 
-# negative images would contain images without faces. 
-# Based on this dataset, we could then extract features to characterize the face (or lack of face) in an image 
-# and build our own classifier. 
-facesClassifier = cv2.CascadeClassifier(args["fclassifier"])
-
-# “sliding window” approach
-# These classifiers work by scanning an image from left to right, and top to bottom, at varying scale sizes. 
-# As the window moves from left to right and top to bottom, one pixel at a time, the classifier is asked whether or
-# not it “thinks” there is a face in the current window
-
-# Detecting the actual faces in the image is handled by making a call to the detectMultiScale method of
-# our classifier created. We supplies his scaleFactor, minNeighbors and minSize, then the method takes care of 
-# the entire face detection process for us!
-faces = facesClassifier.detectMultiScale(gray, scaleFactor = 1.3, minNeighbors = 5, minSize = (30,30))
-
-# The detectMultiScale method then returns rects, a list of tuples containing the bounding boxes of the faces 
-# in the image. These bounding boxes are simply the (x, y) location of the face, along with the width and height of the box.
-print(f"I found {len(faces)} face(s)")
-
-# loop over the faces and draw a rectangle surrounding each
-for (i, (x, y, w, h)) in enumerate(faces):
-    cv2.rectangle(image, pt1 = (x, y), pt2 = (x + w, y + h), color = (0, 0, 255), thickness = 2)
-    cv2.putText(image, text = f"Face #{i}", org = (x, y - 10), fontFace = cv2.FONT_HERSHEY_SIMPLEX, fontScale = 0.7, color = (0, 0, 255), thickness = 1)
-
-# Display the image to our screen
-cv2.imshow(windowName, image)
-
-# Wait for a key press to finish program
-cv2.waitKey(0)
-
-# Any open window created by OpenCV are closed
-cv2.destroyAllWindows()
\ No newline at end of file
+# Make the modules shared by every script (one folder up) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from cvcommon.cascadebatch import run_cascade_batch
+from cvcommon.cascadeprofiles import add_profile_argument
+from cvcommon.cascadeprofiles import cascade_params
+
+# The parameters of the face detection, the same for a single image and in batch mode (unless
+# --profile picks tuned ones)
+DETECT_PARAMS = {"scaleFactor": 1.3, "minNeighbors": 5, "minSize": (30,30)}
+
+def run_image(args, params):
+    # Configure windows
+    windowName = "Faces Detector"
+    if (args["full"]):
+        cv2.namedWindow(windowName, cv2.WND_PROP_FULLSCREEN)
+        cv2.setWindowProperty(windowName, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+    # Loading the image using OpenCV
+    image = cv2.imread(args["image"])
+
+    # Shrink big images (the cascade scan time grows with the number of pixels)
+    (h, w) = image.shape[:2]
+    if (args["max_dim"] and max(h, w) > args["max_dim"]):
+        r = args["max_dim"] / float(max(h, w))
+        image = cv2.resize(image, (int(w * r), int(h * r)), interpolation = cv2.INTER_AREA)
+
+    # Convert image to grayscale
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    # In order to build face recognition system, we use the built-in Haar cascade classifiers in OpenCV. 
+    # Luckily, these classifiers have already been pre-trained to recognize faces!
+    # OpenCV repository: https://github.com/opencv/opencv
+    # data\haarcascades: This folder contains trained classifiers for detecting objects
+    #                    of a particular type, e.g. faces (frontal, profile), pedestrians etc
+    #
+    # Building our own classifier is certainly outside the scope. But if we wanted to, we would need a
+    # lot of “positive” and “negative” images. Positive images would contain images with faces, whereas 
+    # negative images would contain images without faces. 
+    # Based on this dataset, we could then extract features to characterize the face (or lack of face) in an image 
+    # and build our own classifier. 
+    facesClassifier = cv2.CascadeClassifier(args["fclassifier"])
+
+    # “sliding window” approach
+    # These classifiers work by scanning an image from left to right, and top to bottom, at varying scale sizes. 
+    # As the window moves from left to right and top to bottom, one pixel at a time, the classifier is asked whether or
+    # not it “thinks” there is a face in the current window
+
+    # Detecting the actual faces in the image is handled by making a call to the detectMultiScale method of
+    # our classifier created. We supplies his scaleFactor, minNeighbors and minSize, then the method takes care of 
+    # the entire face detection process for us!
+    faces = facesClassifier.detectMultiScale(gray, **params)
+
+    # The detectMultiScale method then returns rects, a list of tuples containing the bounding boxes of the faces 
+    # in the image. These bounding boxes are simply the (x, y) location of the face, along with the width and height of the box.
+    print(f"I found {len(faces)} face(s)")
+
+    # loop over the faces and draw a rectangle surrounding each
+    for (i, (x, y, w, h)) in enumerate(faces):
+        cv2.rectangle(image, pt1 = (x, y), pt2 = (x + w, y + h), color = (0, 0, 255), thickness = 2)
+        cv2.putText(image, text = f"Face #{i}", org = (x, y - 10), fontFace = cv2.FONT_HERSHEY_SIMPLEX, fontScale = 0.7, color = (0, 0, 255), thickness = 1)
+
+    # Display the image to our screen
+    cv2.imshow(windowName, image)
+
+    # Wait for a key press to finish program
+    cv2.waitKey(0)
+
+    # Any open window created by OpenCV are closed
+    cv2.destroyAllWindows()
+
+
+# The batch workers run this script again on some platforms, so everything that actually runs
+# lives under the main guard
+if __name__ == "__main__":
+    # Construct the argument parser and parse the arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-fc", "--fclassifier", required = False, default="classifiers/haarcascade_frontalface_default.xml", help = "path to where the face cascade resides")
+    ap.add_argument("-i", "--image", required = False, help = "path to where the image file resides")
+    ap.add_argument("-in", "--input", required = False, help = "folder or glob pattern of the images to detect faces on in batch mode (no window)")
+    ap.add_argument("-o", "--output", required = False, default = "output/faces.jsonl", help = "path to the JSON lines output of batch mode")
+    ap.add_argument("-w", "--workers", type = int, default = os.cpu_count(), required = False, help = "number of processes running the cascade in batch mode")
+    ap.add_argument("-io", "--io-workers", type = int, default = 4, required = False, help = "number of threads decoding the images in batch mode")
+    ap.add_argument("-md", "--max-dim", type = int, default = None, required = False, help = "shrink the images whose longest side is bigger than this before detecting")
+    ap.add_argument("-f", "--full", required = False, action='store_true', help = "use full screen mode")
+    add_profile_argument(ap)
+    args = vars(ap.parse_args())
+
+    if ((args["image"] is None) == (args["input"] is None)):
+        ap.error("either --image or --input is required")
+
+    params = cascade_params(args["profile"], args["fclassifier"], DETECT_PARAMS)
+
+    if (args["input"] is not None):
+        run_cascade_batch(args["input"], args["fclassifier"], params, args["output"], workers = args["workers"], ioWorkers = args["io_workers"], maxDim = args["max_dim"])
+    else:
+        run_image(args, params)
\ No newline at end of file
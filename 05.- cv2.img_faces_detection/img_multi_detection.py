@@ -0,0 +1,87 @@
+# Usage:
+# python img_multi_detection.py --image images/cats-005.jpg --full
+# python img_multi_detection.py --image images/people-001.jpg --detect faces eyes --full
+# python img_multi_detection.py --image images/cats-006.jpg --detect faces cats cats-extended --full
+
+# Import the necessary packages
+import argparse
+import os
+import sys
+import cv2
+
+# Make the modules shared by every script (one folder up) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from cvcommon.multicascade import MultiCascade
+from cvcommon.cascadeprofiles import add_profile_argument
+from cvcommon.cascadeprofiles import cascade_params
+
+# The cascades we can look for, by label: the file of each along with how many neighbours a
+# detection needs to be kept and the color it is drawn with
+CASCADES = {
+    "faces": ("classifiers/haarcascade_frontalface_default.xml", 5, (0, 0, 255)),
+    "cats": ("classifiers/haarcascade_frontalcatface.xml", 4, (0, 255, 0)),
+    "cats-extended": ("classifiers/haarcascade_frontalcatface_extended.xml", 4, (255, 0, 0)),
+    "eyes": ("classifiers/haarcascade_eye.xml", 5, (0, 255, 255)),
+}
+
+# Construct the argument parser and parse the arguments
+ap = argparse.ArgumentParser()
+ap.add_argument("-i", "--image", required = True, help = "path to where the image file resides")
+ap.add_argument("-d", "--detect", nargs = "+", default = ["faces", "cats"], choices = list(CASCADES.keys()), help = "what to look for in the image")
+ap.add_argument("-sf", "--scale-factor", type = float, default = None, required = False, help = "how much smaller every level of the image pyramids is, for every cascade (1.05, or the --profile ones)")
+ap.add_argument("-w", "--workers", type = int, default = 4, required = False, help = "number of threads running the cascades at once")
+ap.add_argument("-f", "--full", required = False, action='store_true', help = "use full screen mode")
+add_profile_argument(ap)
+args = vars(ap.parse_args())
+
+# Configure windows
+windowName = "Multi Detector"
+if (args["full"]):
+    cv2.namedWindow(windowName, cv2.WND_PROP_FULLSCREEN)
+    cv2.setWindowProperty(windowName, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+# Loading the image using OpenCV
+image = cv2.imread(args["image"])
+
+# Convert image to grayscale
+gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+# The multi-cascade detector runs every cascade with its own detectMultiScale parameters on the
+# same grayscale image, each one on its own thread, so the detections are the same as calling
+# detectMultiScale once per cascade, and the cascades run at the same time
+# The eye profiles were tuned on face crops (as eyes_tracking searches them), not on whole images,
+# so the eyes always keep the parameters below
+params = {}
+for label in args["detect"]:
+    (path, minNeighbors, _) = CASCADES[label]
+    defaults = {"scaleFactor": 1.05, "minNeighbors": minNeighbors, "minSize": (30,30) if label != "eyes" else (10,10)}
+    params[label] = cascade_params(args["profile"] if label != "eyes" else None, path, defaults)
+    if args["scale_factor"] is not None:
+        params[label]["scaleFactor"] = args["scale_factor"]
+
+detector = MultiCascade(workers = args["workers"])
+for label in args["detect"]:
+    detector.add(label, CASCADES[label][0], **params[label])
+
+# Look for everything at once
+found = detector.detect(gray)
+detector.close()
+
+# Report how many objects of each kind we found
+for label in args["detect"]:
+    print(f"I found {sum(1 for (l, _) in found if l == label)} {label}")
+
+# loop over the detections and draw a labeled rectangle surrounding each
+for (label, (x, y, w, h)) in found:
+    color = CASCADES[label][2]
+    cv2.rectangle(image, pt1 = (x, y), pt2 = (x + w, y + h), color = color, thickness = 2)
+    cv2.putText(image, text = label, org = (x, y - 10), fontFace = cv2.FONT_HERSHEY_SIMPLEX, fontScale = 0.7, color = color, thickness = 1)
+
+# Display the image to our screen
+cv2.imshow(windowName, image)
+
+# Wait for a key press to finish program
+cv2.waitKey(0)
+
+# Any open window created by OpenCV are closed
+cv2.destroyAllWindows()
\ No newline at end of file
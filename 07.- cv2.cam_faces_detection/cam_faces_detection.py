@@ -3,13 +3,25 @@
 
 # Import the necessary packages
 import argparse
+import os
+import sys
 import cv2
 
+# Make the modules shared by every script (one folder up) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from cvcommon.cascadetracking import CascadeTracker
+from cvcommon.motiongate import MotionGate
+from cvcommon.cascadeprofiles import add_profile_argument
+from cvcommon.cascadeprofiles import cascade_params
+
 # Construct the argument parser and parse the arguments
 ap = argparse.ArgumentParser()
 ap.add_argument("-fc", "--fclassifier", required = False, default="classifiers/haarcascade_frontalface_default.xml", help = "path to where the face cascade resides")
 ap.add_argument("-m", "--mirror", required = False, action='store_true', help = "enable mirror mode")
 ap.add_argument("-f", "--full", required = False, action='store_true', help = "use full screen mode")
+ap.add_argument("-t", "--track", type = int, default = 10, required = False, help = "scan the whole frame every N frames and only around the known faces in between, 0 scans the whole frame every time")
+ap.add_argument("-ng", "--no-gate", required = False, action='store_true', help = "run the detector on every frame, even when nothing moved")
+add_profile_argument(ap)
 args = vars(ap.parse_args())
 
 # Configure windows
@@ -31,6 +43,23 @@ cam = cv2.VideoCapture(cv2.CAP_DSHOW)
 # Luckily, these classifiers have already been pre-trained to recognize faces!
 facesClassifier = cv2.CascadeClassifier(args["fclassifier"])
 
+# The detectMultiScale parameters of the faces: the ones below, or the tuned ones of --profile
+faceParams = cascade_params(args["profile"], args["fclassifier"], {"scaleFactor": 1.1, "minNeighbors": 5, "minSize": (30,30)})
+
+# Between two full scans the faces are only searched in a window around where they were on the
+# previous frame, at about the same size, which is much cheaper than scanning the whole frame
+tracker = None if args["track"] <= 0 else CascadeTracker(facesClassifier, fullEvery = args["track"], **faceParams)
+
+# The motion gate compares every frame with the last one the faces were detected on (on a small
+# thumbnail, which is cheap): when nothing moved the previous faces are reused, and when only
+# part of the scene moved the detector only looks at the changed regions
+# (the tracker follows the faces on the whole frame, so it can't be given the changed regions alone)
+gate = None if args["no_gate"] else MotionGate(partial = tracker is None)
+
+def detectFaces(gray):
+    if tracker is not None: return tracker.detect(gray)
+    return facesClassifier.detectMultiScale(gray, **faceParams)
+
 # Display the webcam to our screen
 # Start to lopping over all frames in the webcam.
 # At most basic level, a video is simply a sequence of images put together
@@ -48,7 +77,7 @@ while True:
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
     # Detecting the actual faces in the frame 
-    faces = facesClassifier.detectMultiScale(gray, scaleFactor = 1.1, minNeighbors = 5, minSize = (30,30))
+    faces = detectFaces(gray) if gate is None else gate.detect(gray, detectFaces)
 
     # loop over the faces and draw a rectangle surrounding each
     for (x, y, w, h) in faces:
@@ -62,6 +91,12 @@ while True:
     if (key in [ord("q"), 27] or cv2.getWindowProperty(windowName,cv2.WND_PROP_VISIBLE) < 1) : break
     
 
+# Report how many frames the motion gate and the tracker saved the detector from
+if gate is not None:
+    print("[INFO] motion gate: {}".format(gate.report()))
+if tracker is not None:
+    print("[INFO] face tracking: {}".format(tracker.report()))
+
 # The reference to the video is released
 cam.release()
 
@@ -2,9 +2,21 @@
 # python eyes_tracking.py --full --mirror
 
 # Import the necessary packages
+from concurrent.futures import ThreadPoolExecutor
 import argparse
+import os
+import sys
+import threading
+import numpy as np
 import cv2
 
+# Make the modules shared by every script (one folder up) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from cvcommon.cascadetracking import CascadeTracker
+from cvcommon.motiongate import MotionGate
+from cvcommon.cascadeprofiles import add_profile_argument
+from cvcommon.cascadeprofiles import cascade_params
+
 # Construct the argument parser and parse the arguments
 ap = argparse.ArgumentParser()
 ap.add_argument("-fc", "--fclassifier", required = False, default="classifiers/haarcascade_frontalface_default.xml", help = "path to where the face cascade resides  (optional)")
@@ -12,6 +24,10 @@ ap.add_argument("-ec", "--eclassifier", required = False, default="classifiers/h
 ap.add_argument("-v", "--video", required = False, help = "path to where the video resides  (optional)")
 ap.add_argument("-m", "--mirror", required = False, action='store_true', help = "enable mirror mode  (optional)")
 ap.add_argument("-f", "--full", required = False, action='store_true', help = "use full screen mode  (optional)")
+ap.add_argument("-t", "--track", type = int, default = 10, required = False, help = "scan the whole frame every N frames and only around the known faces in between, 0 scans the whole frame every time  (optional)")
+ap.add_argument("-w", "--workers", type = int, default = 4, required = False, help = "number of threads searching the eyes of different faces at once  (optional)")
+ap.add_argument("-ng", "--no-gate", required = False, action='store_true', help = "run the detectors on every frame, even when nothing moved  (optional)")
+add_profile_argument(ap)
 args = vars(ap.parse_args())
 
 # Configure windows
@@ -29,7 +45,51 @@ else:
 
 # In order to build face and eyes recognition system, we use the built-in Haar cascade classifiers in OpenCV. 
 facesClassifier = cv2.CascadeClassifier(args["fclassifier"])
-eyesClassifier = cv2.CascadeClassifier(args["eclassifier"])
+
+# The detectMultiScale parameters of the faces: the ones below, or the tuned ones of --profile
+faceParams = cascade_params(args["profile"], args["fclassifier"], {"scaleFactor": 1.1, "minNeighbors": 5, "minSize": (30,30)})
+
+# The eyes of the different faces are searched at the same time on a pool of threads (OpenCV
+# releases the GIL while it runs). A cascade can't be used by two threads at once, so every
+# thread loads its own
+eyesPool = ThreadPoolExecutor(max_workers = max(1, args["workers"]))
+eyesClassifiers = threading.local()
+
+# Every face is resized to the same canonical size before searching its eyes, so the eye cascade
+# always scans the same small pyramid whatever the size of the face
+FACE_SIZE = 96
+
+# The detectMultiScale parameters of the eyes (on the canonical faces): the ones below, or the
+# tuned ones of --profile
+eyeParams = cascade_params(args["profile"], args["eclassifier"], {"scaleFactor": 1.3, "minNeighbors": 5, "minSize": (15,15)})
+
+# Between two full scans the faces are only searched in a window around where they were on the
+# previous frame, at about the same size, which is much cheaper than scanning the whole frame
+tracker = None if args["track"] <= 0 else CascadeTracker(facesClassifier, fullEvery = args["track"], **faceParams)
+
+# The motion gate compares every frame with the last one the faces were detected on (on a small
+# thumbnail, which is cheap): when nothing moved the previous faces are reused, and when only
+# part of the scene moved the detector only looks at the changed regions
+# (the tracker follows the faces on the whole frame, so it can't be given the changed regions alone)
+gate = None if args["no_gate"] else MotionGate(partial = tracker is None)
+
+# The eyes found on every face are kept (by face box) so a face the gate reused keeps its eyes
+# without searching them again
+eyesCache = {}
+
+def detectFaces(gray):
+    if tracker is not None: return tracker.detect(gray)
+    return facesClassifier.detectMultiScale(gray, **faceParams)
+
+def detectEyes(faceROI):
+    # Load the eye cascade of this thread the first time it is used
+    if not hasattr(eyesClassifiers, "cascade"):
+        eyesClassifiers.cascade = cv2.CascadeClassifier(args["eclassifier"])
+
+    # Search the eyes on the face at its canonical size, the boxes are in canonical coordinates
+    canonical = cv2.resize(faceROI, (FACE_SIZE, FACE_SIZE), interpolation = cv2.INTER_AREA)
+    eyes = eyesClassifiers.cascade.detectMultiScale(canonical, **eyeParams, maxSize = (FACE_SIZE // 2, FACE_SIZE // 2))
+    return np.array(eyes, dtype = "int").reshape(-1, 4)
 
 # Display the video or webcam to our screen
 # Start to lopping over all frames in the video or webcam.
@@ -51,25 +111,38 @@ while True:
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
     # Detecting the actual faces in the frame 
-    faces = facesClassifier.detectMultiScale(gray, scaleFactor = 1.1, minNeighbors = 5, minSize = (30,30))
+    faces = detectFaces(gray) if gate is None else gate.detect(gray, detectFaces)
+    previousEyes, eyesCache = eyesCache, {}
+
+    # The faces which did not move keep their eyes, the others are searched
+    faces = np.array(faces, dtype = "int").reshape(-1, 4)
+    faceKeys = [tuple(face) for face in faces]
+    for faceKey in faceKeys:
+        if gate is not None and faceKey in previousEyes: eyesCache[faceKey] = previousEyes[faceKey]
+
+    # Extract the face regions of interest (ROI) from the image using NumPy array slicing
+    # (slicing[startY:endY, startX:endX]) and detect the actual eyes on all of them at once
+    search = [faceKey for faceKey in faceKeys if faceKey not in eyesCache]
+    faceROIs = [gray[fy:fy + fh, fx:fx + fw] for (fx, fy, fw, fh) in search]
+    for (faceKey, eyes) in zip(search, eyesPool.map(detectEyes, faceROIs)):
+        eyesCache[faceKey] = eyes
 
-    # loop over the faces
+    # Move every eye from the canonical coordinates of its face to frame coordinates in one step:
+    # scale it by the size of its face and shift it by the corner of the face
+    counts = [len(eyesCache[faceKey]) for faceKey in faceKeys]
+    eyes = np.vstack([eyesCache[faceKey] for faceKey in faceKeys] + [np.zeros((0, 4), dtype = "int")])
+    owners = np.repeat(faces, counts, axis = 0)
+    scale = owners[:, 2:4] / float(FACE_SIZE)
+    eyes = np.hstack([owners[:, 0:2] + eyes[:, 0:2] * scale, eyes[:, 2:4] * scale]).astype("int")
+
+    # loop over the faces and draw a rectangle surrounding each
     for (fx, fy, fw, fh) in faces:
-        # Draw a rectangle surrounding each
-        cv2.rectangle(frame, pt1 = (fx, fy), pt2 = (fx + fw, fy + fh), color = (0, 0, 255), thickness = 2)
-
-        # Extract the face region of interest (ROI) from the image using NumPy array slicing
-        # The faceROI variable cointains the bounding box region of the face
-        # slicing[startY:endY, startX:endX]
-        faceROI = gray[fy:fy + fh, fx:fx + fw]
-        
-        # Detecting the actual eyes in the frame 
-        eyes = eyesClassifier.detectMultiScale(faceROI, scaleFactor = 1.3, minNeighbors = 5, minSize = (20,2cls0))
-
-        # loop over the eyes
-        for (ex,ey,ew,eh) in eyes:
-            # Draw a rectangle surrounding each (OpenCV stores RGB pixels in reverse order)
-            cv2.rectangle(frame, pt1 = (fx + ex, fy + ey), pt2 = (fx + ex + ew, fy + ey + eh), color = (0, 255, 0), thickness = 2)
+        cv2.rectangle(frame, pt1 = (int(fx), int(fy)), pt2 = (int(fx + fw), int(fy + fh)), color = (0, 0, 255), thickness = 2)
+
+    # loop over the eyes
+    for (ex, ey, ew, eh) in eyes:
+        # Draw a rectangle surrounding each (OpenCV stores RGB pixels in reverse order)
+        cv2.rectangle(frame, pt1 = (int(ex), int(ey)), pt2 = (int(ex + ew), int(ey + eh)), color = (0, 255, 0), thickness = 2)
     
     # Display the output
     cv2.imshow(windowName, frame)
@@ -79,6 +152,15 @@ while True:
     if (key in [ord("q"), 27] or cv2.getWindowProperty(windowName,cv2.WND_PROP_VISIBLE) < 1) : break
     
 
+# Report how many frames the motion gate and the tracker saved the detector from
+if gate is not None:
+    print("[INFO] motion gate: {}".format(gate.report()))
+if tracker is not None:
+    print("[INFO] face tracking: {}".format(tracker.report()))
+
+# Stop the threads searching the eyes
+eyesPool.shutdown()
+
 # The reference to the video is released
 video.release()
 
@@ -0,0 +1,248 @@
+# USAGE
+# Compare the array-backed CentroidTracker against the original
+# OrderedDict implementation on synthetic scenes:
+# python benchmark_centroidtracker.py
+# python benchmark_centroidtracker.py --objects 10 100 1000 --frames 200
+
+# import the necessary packages
+from pyimagesearch.centroidtracker import CentroidTracker
+from scipy.spatial import distance as dist
+from collections import OrderedDict
+import numpy as np
+import argparse
+import time
+
+# construct the argument parse and parse the arguments
+ap = argparse.ArgumentParser()
+ap.add_argument("-n", "--objects", type=int, nargs="+", default=[10, 100, 1000],help="# of objects in each synthetic scene")
+ap.add_argument("-f", "--frames", type=int, default=200,help="# of frames per scene")
+ap.add_argument("-d", "--dropout", type=float, default=0.05,help="probability of an object missing from a frame")
+ap.add_argument("-s", "--seed", type=int, default=42,help="random seed used to build the scenes")
+args = vars(ap.parse_args())
+
+# the original OrderedDict based tracker, kept here verbatim as the
+# baseline for the comparison
+class LegacyCentroidTracker:
+	def __init__(self, maxDisappeared=50, maxDistance=50):
+		# initialize the next unique object ID along with two ordered
+		# dictionaries used to keep track of mapping a given object
+		# ID to its centroid and number of consecutive frames it has
+		# been marked as "disappeared", respectively
+		self.nextObjectID = 0
+		self.objects = OrderedDict()
+		self.disappeared = OrderedDict()
+
+		# store the number of maximum consecutive frames a given
+		# object is allowed to be marked as "disappeared" until we
+		# need to deregister the object from tracking
+		self.maxDisappeared = maxDisappeared
+
+		# store the maximum distance between centroids to associate
+		# an object -- if the distance is larger than this maximum
+		# distance we'll start to mark the object as "disappeared"
+		self.maxDistance = maxDistance
+
+	def register(self, centroid):
+		# when registering an object we use the next available object
+		# ID to store the centroid
+		self.objects[self.nextObjectID] = centroid
+		self.disappeared[self.nextObjectID] = 0
+		self.nextObjectID += 1
+
+	def deregister(self, objectID):
+		# to deregister an object ID we delete the object ID from
+		# both of our respective dictionaries
+		del self.objects[objectID]
+		del self.disappeared[objectID]
+
+	def update(self, rects):
+		# check to see if the list of input bounding box rectangles
+		# is empty
+		if len(rects) == 0:
+			# loop over any existing tracked objects and mark them
+			# as disappeared
+			for objectID in list(self.disappeared.keys()):
+				self.disappeared[objectID] += 1
+
+				# if we have reached a maximum number of consecutive
+				# frames where a given object has been marked as
+				# missing, deregister it
+				if self.disappeared[objectID] > self.maxDisappeared:
+					self.deregister(objectID)
+
+			# return early as there are no centroids or tracking info
+			# to update
+			return self.objects
+
+		# initialize an array of input centroids for the current frame
+		inputCentroids = np.zeros((len(rects), 2), dtype="int")
+
+		# loop over the bounding box rectangles
+		for (i, (startX, startY, endX, endY)) in enumerate(rects):
+			# use the bounding box coordinates to derive the centroid
+			cX = int((startX + endX) / 2.0)
+			cY = int((startY + endY) / 2.0)
+			inputCentroids[i] = (cX, cY)
+
+		# if we are currently not tracking any objects take the input
+		# centroids and register each of them
+		if len(self.objects) == 0:
+			for i in range(0, len(inputCentroids)):
+				self.register(inputCentroids[i])
+
+		# otherwise, are are currently tracking objects so we need to
+		# try to match the input centroids to existing object
+		# centroids
+		else:
+			# grab the set of object IDs and corresponding centroids
+			objectIDs = list(self.objects.keys())
+			objectCentroids = list(self.objects.values())
+
+			# compute the distance between each pair of object
+			# centroids and input centroids, respectively -- our
+			# goal will be to match an input centroid to an existing
+			# object centroid
+			D = dist.cdist(np.array(objectCentroids), inputCentroids)
+
+			# in order to perform this matching we must (1) find the
+			# smallest value in each row and then (2) sort the row
+			# indexes based on their minimum values so that the row
+			# with the smallest value as at the *front* of the index
+			# list
+			rows = D.min(axis=1).argsort()
+
+			# next, we perform a similar process on the columns by
+			# finding the smallest value in each column and then
+			# sorting using the previously computed row index list
+			cols = D.argmin(axis=1)[rows]
+
+			# in order to determine if we need to update, register,
+			# or deregister an object we need to keep track of which
+			# of the rows and column indexes we have already examined
+			usedRows = set()
+			usedCols = set()
+
+			# loop over the combination of the (row, column) index
+			# tuples
+			for (row, col) in zip(rows, cols):
+				# if we have already examined either the row or
+				# column value before, ignore it
+				if row in usedRows or col in usedCols:
+					continue
+
+				# if the distance between centroids is greater than
+				# the maximum distance, do not associate the two
+				# centroids to the same object
+				if D[row, col] > self.maxDistance:
+					continue
+
+				# otherwise, grab the object ID for the current row,
+				# set its new centroid, and reset the disappeared
+				# counter
+				objectID = objectIDs[row]
+				self.objects[objectID] = inputCentroids[col]
+				self.disappeared[objectID] = 0
+
+				# indicate that we have examined each of the row and
+				# column indexes, respectively
+				usedRows.add(row)
+				usedCols.add(col)
+
+			# compute both the row and column index we have NOT yet
+			# examined
+			unusedRows = set(range(0, D.shape[0])).difference(usedRows)
+			unusedCols = set(range(0, D.shape[1])).difference(usedCols)
+
+			# in the event that the number of object centroids is
+			# equal or greater than the number of input centroids
+			# we need to check and see if some of these objects have
+			# potentially disappeared
+			if D.shape[0] >= D.shape[1]:
+				# loop over the unused row indexes
+				for row in unusedRows:
+					# grab the object ID for the corresponding row
+					# index and increment the disappeared counter
+					objectID = objectIDs[row]
+					self.disappeared[objectID] += 1
+
+					# check to see if the number of consecutive
+					# frames the object has been marked "disappeared"
+					# for warrants deregistering the object
+					if self.disappeared[objectID] > self.maxDisappeared:
+						self.deregister(objectID)
+
+			# otherwise, if the number of input centroids is greater
+			# than the number of existing object centroids we need to
+			# register each new input centroid as a trackable object
+			else:
+				for col in unusedCols:
+					self.register(inputCentroids[col])
+
+		# return the set of trackable objects
+		return self.objects
+
+def make_scene(numObjects, numFrames, dropout, seed):
+	# spread the objects over a large canvas and let each of them walk
+	# with a constant velocity plus some jitter, randomly dropping a
+	# few of them from every frame like a detector/tracker would
+	rng = np.random.RandomState(seed)
+	side = int(np.sqrt(numObjects) * 120) + 200
+	positions = rng.uniform(0, side, size=(numObjects, 2))
+	velocities = rng.uniform(-3, 3, size=(numObjects, 2))
+	frames = []
+
+	for i in range(0, numFrames):
+		positions += velocities + rng.normal(0, 0.5, size=positions.shape)
+		visible = rng.uniform(size=numObjects) > dropout
+		(x, y) = (positions[visible, 0], positions[visible, 1])
+		rects = np.stack([x - 20, y - 40, x + 20, y + 40], axis=1)
+		frames.append([tuple(int(v) for v in r) for r in rects])
+
+	return frames
+
+def run(tracker, frames):
+	# time every call to `update`, returning the per-frame latencies
+	# along with the object IDs/centroids reported on each frame
+	timings = []
+	outputs = []
+
+	for rects in frames:
+		start = time.perf_counter()
+		objects = tracker.update(rects)
+		timings.append(time.perf_counter() - start)
+		outputs.append({k: tuple(int(v) for v in c)
+			for (k, c) in objects.items()})
+
+	return (np.array(timings) * 1000.0, outputs)
+
+# loop over the scene sizes
+print("{:>8} {:>10} {:>12} {:>12} {:>8}".format("objects", "tracker",
+	"mean (ms)", "p95 (ms)", "speedup"))
+for numObjects in args["objects"]:
+	frames = make_scene(numObjects, args["frames"], args["dropout"],
+		args["seed"])
+
+	# run the original tracker followed by both assignment modes of
+	# the array-backed one
+	(base, baseOut) = run(LegacyCentroidTracker(maxDisappeared=40,
+		maxDistance=50), frames)
+	(greedy, greedyOut) = run(CentroidTracker(maxDisappeared=40,
+		maxDistance=50), frames)
+	(hungarian, _) = run(CentroidTracker(maxDisappeared=40,
+		maxDistance=50, assignment="hungarian"), frames)
+
+	# the greedy mode follows the same matching rules as the original
+	# tracker, but the original registers new objects in Python set
+	# order -- objects registered on the same frame may therefore get
+	# their IDs (and later on, tie breaks) in a different order, so we
+	# report how many frames track exactly the same centroids
+	same = np.mean([sorted(a.values()) == sorted(b.values())
+		for (a, b) in zip(baseOut, greedyOut)]) * 100
+
+	for (name, t) in (("original", base), ("greedy", greedy),
+		("hungarian", hungarian)):
+		print("{:>8} {:>10} {:>12.3f} {:>12.3f} {:>7.1f}x".format(numObjects,
+			name, t.mean(), np.percentile(t, 95), base.mean() / t.mean()))
+
+	print("[INFO] greedy matches the original on {:.1f}% of frames".format(
+		same))
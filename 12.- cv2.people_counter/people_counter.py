@@ -5,36 +5,53 @@
 #
 # To read from webcam and write back out to disk:
 # python people_counter.py --output output/webcam_output.avi
+#
+# To spread the work over more cores on recorded footage:
+# python people_counter.py --input videos/video-01.mp4 --prepare-workers 2 --detect-workers 2 --render-workers 2
+#
+# To count several cameras/videos at once sharing a single network:
+# python people_counter.py --sources 0 1 videos/video-01.mp4
+#
+# To detect sooner when tracking gets hard and back off on empty scenes:
+# python people_counter.py --input videos/video-01.mp4 --adaptive
+#
+# To run without any window and stream the counts as JSON lines:
+# python people_counter.py --input videos/video-01.mp4 --headless --events output/events.jsonl
+# python people_counter.py --headless --events tcp://127.0.0.1:5555
+#
+# To see how long each stage takes (and export a Chrome trace):
+# python people_counter.py --input videos/video-01.mp4 --timing --timing-interval 10 --trace output/trace.json
 
 # import the necessary packages
-from pyimagesearch.centroidtracker import CentroidTracker
-from pyimagesearch.trackableobject import TrackableObject
-from imutils.video import VideoStream
+from pyimagesearch.peoplecounter import PeopleCounter
+from pyimagesearch.skipscheduler import SkipScheduler
+from pyimagesearch.eventstream import EventStream
+from pyimagesearch.stagetimer import StageTimer
+from pyimagesearch.threadedcapture import ThreadedCapture
+from pyimagesearch.pipeline import PipelineStage
+from pyimagesearch.pipeline import Pipeline
 from imutils.video import FPS
+from functools import partial
+from threading import Event
+from queue import Queue
 import numpy as np
 import argparse
 import imutils
+import signal
 import time
-import dlib
 import cv2
-
-# construct the argument parse and parse the arguments
-ap = argparse.ArgumentParser()
-ap.add_argument("-p", "--prototxt", required=False, default="model/MobileNetSSD_deploy.prototxt",help="path to Caffe 'deploy' prototxt file")
-ap.add_argument("-m", "--model", required=False, default="model/MobileNetSSD_deploy.caffemodel",help="path to Caffe pre-trained model")
-ap.add_argument("-i", "--input", type=str,help="path to optional input video file")
-ap.add_argument("-o", "--output", type=str,help="path to optional output video file")
-ap.add_argument("-c", "--confidence", type=float, default=0.4,help="minimum probability to filter weak detections")
-ap.add_argument("-s", "--skip-frames", type=int, default=30,help="# of skip frames between detections")
-ap.add_argument("-f", "--full", required = False, action='store_true', help = "use full screen mode  (optional)")
-args = vars(ap.parse_args())
-
-
-# Configure windows
-windowName = "Multi Tracking"
-if (args["full"]):
-    cv2.namedWindow(windowName, cv2.WND_PROP_FULLSCREEN)
-    cv2.setWindowProperty(windowName, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+import sys
+import os
+
+# make the modules shared by every script (one folder up) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from cvcommon.models import registry
+from cvcommon.dnnbackend import add_dnn_arguments
+from cvcommon.dnnbackend import select_backend
+from cvcommon.tiling import TiledDetector
+from cvcommon.tiling import parse_polygon
+from cvcommon.postprocess import postprocess
+from cvcommon.asyncinfer import AsyncNet
 
 # initialize the list of class labels MobileNet SSD was trained to
 # detect
@@ -43,74 +60,163 @@ CLASSES = ["background", "aeroplane", "bicycle", "bird", "boat",
 	"dog", "horse", "motorbike", "person", "pottedplant", "sheep",
 	"sofa", "train", "tvmonitor"]
 
-# load our serialized model from disk
-print("[INFO] loading model...")
-net = cv2.dnn.readNetFromCaffe(args["prototxt"], args["model"])
-
-# if a video path was not supplied, grab a reference to the webcam
-if not args.get("input", False):
-	print("[INFO] starting video stream...")
-	vs = VideoStream(src=0).start()
-	time.sleep(2.0)
-
-# otherwise, grab a reference to the video file
-else:
-	print("[INFO] opening video file...")
-	vs = cv2.VideoCapture(args["input"])
-
-# initialize the video writer (we'll instantiate later if need be)
-writer = None
-
-# initialize the frame dimensions (we'll set them as soon as we read
-# the first frame from the video)
-W = None
-H = None
-
-# instantiate our centroid tracker, then initialize a list to store
-# each of our dlib correlation trackers, followed by a dictionary to
-# map each unique object ID to a TrackableObject
-ct = CentroidTracker(maxDisappeared=40, maxDistance=50)
-trackers = []
-trackableObjects = {}
-
-# initialize the total number of frames processed thus far, along
-# with the total number of objects that have moved either up or down
-totalFrames = 0
-totalDown = 0
-totalUp = 0
-
-# start the frames per second throughput estimator
-fps = FPS().start()
-
-# loop over frames from the video stream
-while True:
-	# grab the next frame and handle if we are reading from either
-	# VideoCapture or VideoStream
-	frame = vs.read()
-	frame = frame[1] if args.get("input", False) else frame
-
-	# if we are viewing a video and we did not grab a frame then we
-	# have reached the end of the video
-	if args["input"] is not None and frame is None:
-		break
-
+# initialize the event set when the user asks us to stop (Ctrl+C),
+# which is the only way to end a headless run on a live source
+stopEvent = Event()
+
+# initialize the per-stage latency timer (disabled unless --timing is
+# given, in which case timing a stage costs next to nothing)
+timer = StageTimer()
+
+# initialize the tiled detector (only used with --tiles, in which case
+# the detector runs on overlapping tiles of the full resolution frame)
+tiler = None
+
+# initialize the networks the detection workers borrow along with the
+# backend they run on (loaded once the size of the frames is known)
+nets = None
+backend = None
+
+def input_shape(sizes):
+	# the shape of the blobs the network is fed with, given the (W, H)
+	# size of the frames of every source: the tiles of a frame (in a
+	# single batch) with tiling, otherwise the frames resized to a
+	# width of 500 pixels, one per source (when they are all due for a
+	# detection at once)
+	(W, H) = sizes[0]
+	if W == 0 or H == 0:
+		return (1, 3, 300, 300)
+
+	if tiler is not None:
+		(w, h) = tiler.inputSize
+		return (len(tiler.tiles(W, H)), 3, h, w)
+
+	return (len(sizes), 3, int(H * (500 / float(W))), 500)
+
+def load_nets(sizes):
+	# load our serialized model from disk, warming it up with the shape
+	# of the blobs it is fed with (a new shape makes OpenCV set the
+	# network up again, so the first frame isn't slower than the rest)
+	# and benchmarking the backends on that shape too -- a network can
+	# only run one forward pass at a time, so every detection worker
+	# gets its own copy which it borrows from the queue
+	global nets, backend
+	shape = input_shape(sizes)
+	print("[INFO] loading model...")
+	(backend, target, threads) = select_backend(args, args["model"],
+		args["prototxt"], shape)
+	nets = Queue()
+	for i in range(0, max(1, args["detect_workers"])):
+		nets.put(registry.load(args["model"], args["prototxt"],
+			warmup=shape, instance=i, backend=backend, target=target))
+
+def prepare_frame(frameID, frame):
 	# resize the frame to have a maximum width of 500 pixels (the
 	# less data we have, the faster we can process it), then convert
 	# the frame from BGR to RGB for dlib
-	frame = imutils.resize(frame, width=500)
-	rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-	# if the frame dimensions are empty, set them
-	if W is None or H is None:
-		(H, W) = frame.shape[:2]
-
-	# if we are supposed to be writing a video to disk, initialize
-	# the writer
-	if args["output"] is not None and writer is None:
-		fourcc = cv2.VideoWriter_fourcc(*"MJPG")
-		writer = cv2.VideoWriter(args["output"], fourcc, 30,
-			(W, H), True)
-
+	with timer.time("resize"):
+		full = frame
+		frame = imutils.resize(frame, width=500)
+	with timer.time("cvtColor"):
+		rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+	# the tiled detector needs the frame at its original resolution
+	item = {"frame": frame, "rgb": rgb, "boxes": None}
+	if tiler is not None:
+		item["full"] = full
+
+	return item
+
+def detect_people(scheduler, frameID, item):
+	# when the detection schedule is known ahead of time, run the
+	# computationally expensive object detector on the scheduled frames
+	# right here so it overlaps with the tracking of the previous ones
+	# (an adaptive schedule detects from the tracking stage instead)
+	if scheduler.isScheduled(frameID):
+		item["boxes"] = run_detector(item)
+
+	return item
+
+def run_detector(item):
+	# with tiling, detect the people on the full resolution frame and
+	# scale their boxes down to the resized frame we track on
+	if tiler is not None:
+		return run_tiled_detector(item)
+
+	# convert the frame to a blob and pass the blob through the
+	# network and obtain the detections
+	frame = item["frame"]
+	(H, W) = frame.shape[:2]
+	net = nets.get()
+	try:
+		with timer.time("forward"):
+			blob = cv2.dnn.blobFromImage(frame, 0.007843, (W, H), 127.5)
+			net.setInput(blob)
+			detections = net.forward()
+	finally:
+		nets.put(net)
+
+	# return the boxes the tracking stage (re)starts its trackers from
+	return extract_people(detections, W, H)
+
+def run_tiled_detector(item):
+	# run the overlapping tiles (within the region of interest) through
+	# the network in a single batch, merging the duplicates
+	net = nets.get()
+	try:
+		with timer.time("forward"):
+			found = tiler.detect(net, item["full"], args["confidence"],
+				classes=[CLASSES.index("person")])
+	finally:
+		nets.put(net)
+
+	ratio = item["frame"].shape[1] / float(item["full"].shape[1])
+	return (found["box"] * ratio).astype("int")
+
+def detect_people_batch(items):
+	# the tiles of a frame already fill a batch, so with tiling every
+	# frame goes through the tiled detector on its own
+	if tiler is not None:
+		for item in items:
+			item["boxes"] = run_tiled_detector(item)
+		return
+
+	# pass the frames of every stream through the network in one
+	# forward pass
+	net = nets.get()
+	try:
+		with timer.time("forward"):
+			net.setInput(batch_blob(items))
+			detections = net.forward()
+	finally:
+		nets.put(net)
+
+	assign_batch(items, detections)
+
+def batch_blob(items):
+	# stack the frames of every stream into a single blob (they are
+	# all resized to the dimensions of the first frame)
+	frames = [item["frame"] for item in items]
+	(H, W) = frames[0].shape[:2]
+	return cv2.dnn.blobFromImages(frames, 0.007843, (W, H), 127.5)
+
+def assign_batch(items, detections):
+	# the first column of every detection holds the index of the
+	# image in the batch it belongs to, so hand each stream back its
+	# own detections (the coordinates are relative to the image size)
+	for (i, item) in enumerate(items):
+		(h, w) = item["frame"].shape[:2]
+		rows = detections[:, :, detections[0, 0, :, 0] == i]
+		item["boxes"] = extract_people(rows, w, h)
+
+def extract_people(detections, W, H):
+	# keep the confident "person" detections and return their boxes
+	# (in pixels) in a single vectorized pass
+	found = postprocess(detections, W, H, args["confidence"],
+		classes=[CLASSES.index("person")])
+	return found["box"]
+
+def track_people(counter, scheduler, frameID, item):
 	# initialize the current status along with our list of bounding
 	# box rectangles returned by either (1) our object detector or
 	# (2) the correlation trackers
@@ -118,176 +224,478 @@ while True:
 	rects = []
 
 	# check to see if we should run a more computationally expensive
-	# object detection method to aid our tracker
-	if totalFrames % args["skip_frames"] == 0:
-		# set the status and initialize our new set of object trackers
+	# object detection method to aid our tracker -- the detections may
+	# already be attached to the frame, otherwise we run it right now
+	rgb = item.pop("rgb")
+	detected = item["boxes"] is not None or scheduler.shouldDetect(frameID)
+
+	# keep why the adaptive scheduler picked this frame for a detection
+	# (or to be tracked) before it decides on the next one
+	reason = scheduler.reason
+	if detected:
+		if item["boxes"] is None:
+			item["boxes"] = run_detector(item)
+
+		# set the status and start a new set of trackers from the
+		# detections
 		status = "Detecting"
-		trackers = []
-
-		# convert the frame to a blob and pass the blob through the
-		# network and obtain the detections
-		blob = cv2.dnn.blobFromImage(frame, 0.007843, (W, H), 127.5)
-		net.setInput(blob)
-		detections = net.forward()
-
-		# loop over the detections
-		for i in np.arange(0, detections.shape[2]):
-			# extract the confidence (i.e., probability) associated
-			# with the prediction
-			confidence = detections[0, 0, i, 2]
-
-			# filter out weak detections by requiring a minimum
-			# confidence
-			if confidence > args["confidence"]:
-				# extract the index of the class label from the
-				# detections list
-				idx = int(detections[0, 0, i, 1])
-
-				# if the class label is not a person, ignore it
-				if CLASSES[idx] != "person":
-					continue
-
-				# compute the (x, y)-coordinates of the bounding box
-				# for the object
-				box = detections[0, 0, i, 3:7] * np.array([W, H, W, H])
-				(startX, startY, endX, endY) = box.astype("int")
-
-				# construct a dlib rectangle object from the bounding
-				# box coordinates and then start the dlib correlation
-				# tracker
-				tracker = dlib.correlation_tracker()
-				rect = dlib.rectangle(startX, startY, endX, endY)
-				tracker.start_track(rgb, rect)
-
-				# add the tracker to our list of trackers so we can
-				# utilize it during skip frames
-				trackers.append(tracker)
+		with timer.time("trackers"):
+			counter.startTrackers(rgb, item["boxes"])
 
 	# otherwise, we should utilize our object *trackers* rather than
 	# object *detectors* to obtain a higher frame processing throughput
 	else:
-		# loop over the trackers
-		for tracker in trackers:
-			# set the status of our system to be 'tracking' rather
-			# than 'waiting' or 'detecting'
+		# set the status of our system to be 'tracking' rather than
+		# 'waiting' or 'detecting' as long as something is tracked
+		if len(counter.trackers) > 0:
 			status = "Tracking"
 
-			# update the tracker and grab the updated position
-			tracker.update(rgb)
-			pos = tracker.get_position()
+		with timer.time("trackers"):
+			rects = counter.updateTrackers(rgb)
+
+	# the full resolution frame is not needed anymore
+	item.pop("full", None)
+
+	# associate the centroids and update the counts -- the centroid
+	# tracker hands back a fresh dictionary every frame, so the render
+	# stage can draw it while we are already tracking the next frames
+	H = item["frame"].shape[0]
+	with timer.time("centroids"):
+		item["objects"] = counter.update(rects, H)
+
+	# let the scheduler decide when the next detection happens based on
+	# the motion in the frame, the confidence of the trackers and how
+	# close the objects are to the counting line
+	confidences = [] if detected else counter.trackers.confidences
+	scheduler.update(item["frame"], detected, confidences, item["objects"],
+		H // 2)
+
+	# keep the objects counted on this frame for the event stream
+	item["events"] = counter.events
 
-			# unpack the position object
-			startX = int(pos.left())
-			startY = int(pos.top())
-			endX = int(pos.right())
-			endY = int(pos.bottom())
+	# with an adaptive schedule, show the reason behind the decision
+	# along with the status (e.g., "Tracking (near line)")
+	if scheduler.adaptive and status != "Waiting":
+		status = "{} ({})".format(status, reason)
+
+	# construct a tuple of information we will be displaying on the
+	# frame
+	item["info"] = [
+		("Up", counter.totalUp),
+		("Down", counter.totalDown),
+		("Status", status),
+	]
 
-			# add the bounding box coordinates to the rectangles list
-			rects.append((startX, startY, endX, endY))
+	return item
+
+def render_frame(frameID, item):
+	with timer.time("draw"):
+		return draw_frame(item)
+
+def draw_frame(item):
+	frame = item["frame"]
+	(H, W) = frame.shape[:2]
 
 	# draw a horizontal line in the center of the frame -- once an
 	# object crosses this line we will determine whether they were
 	# moving 'up' or 'down'
 	cv2.line(frame, (0, H // 2), (W, H // 2), (0, 255, 255), 2)
 
-	# use the centroid tracker to associate the (1) old object
-	# centroids with (2) the newly computed object centroids
-	objects = ct.update(rects)
-
-	# loop over the tracked objects
-	for (objectID, centroid) in objects.items():
-		# check to see if a trackable object exists for the current
-		# object ID
-		to = trackableObjects.get(objectID, None)
-
-		# if there is no existing trackable object, create one
-		if to is None:
-			to = TrackableObject(objectID, centroid)
-
-		# otherwise, there is a trackable object so we can utilize it
-		# to determine direction
-		else:
-			# the difference between the y-coordinate of the *current*
-			# centroid and the mean of *previous* centroids will tell
-			# us in which direction the object is moving (negative for
-			# 'up' and positive for 'down')
-			y = [c[1] for c in to.centroids]
-			direction = centroid[1] - np.mean(y)
-			to.centroids.append(centroid)
-
-			# check to see if the object has been counted or not
-			if not to.counted:
-				# if the direction is negative (indicating the object
-				# is moving up) AND the centroid is above the center
-				# line, count the object
-				if direction < 0 and centroid[1] < H // 2:
-					totalUp += 1
-					to.counted = True
-
-				# if the direction is positive (indicating the object
-				# is moving down) AND the centroid is below the
-				# center line, count the object
-				elif direction > 0 and centroid[1] > H // 2:
-					totalDown += 1
-					to.counted = True
-
-		# store the trackable object in our dictionary
-		trackableObjects[objectID] = to
-
-		# draw both the ID of the object and the centroid of the
-		# object on the output frame
+	# draw both the ID of the object and the centroid of the object on
+	# the output frame
+	for (objectID, centroid) in item["objects"].items():
 		text = "ID {}".format(objectID)
 		cv2.putText(frame, text, (centroid[0] - 10, centroid[1] - 10),
 			cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
 		cv2.circle(frame, (centroid[0], centroid[1]), 4, (0, 255, 0), -1)
 
-	# construct a tuple of information we will be displaying on the
-	# frame
-	info = [
-		("Up", totalUp),
-		("Down", totalDown),
-		("Status", status),
-	]
-
 	# loop over the info tuples and draw them on our frame
-	for (i, (k, v)) in enumerate(info):
+	for (i, (k, v)) in enumerate(item["info"]):
 		text = "{}: {}".format(k, v)
 		cv2.putText(frame, text, (10, H - ((i * 20) + 20)),
 			cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
 
-	# check to see if we should write the frame to disk
-	if writer is not None:
-		writer.write(frame)
+	return item
+
+def make_scheduler():
+	# build the detection scheduler: a fixed one running the detector
+	# every `skip_frames` frames, or an adaptive one
+	return SkipScheduler(skipFrames=args["skip_frames"],
+		adaptive=args["adaptive"], minSkip=args["min_skip"],
+		maxSkip=args["max_skip"])
+
+def open_stream(src):
+	# a device index (e.g., 0) is a live camera: frames are decoded on
+	# a background thread and, since this is a live source, the oldest
+	# buffered frame is dropped whenever we fall behind
+	if isinstance(src, int) or src.isdigit():
+		print("[INFO] starting video stream {}...".format(src))
+		queueSize = args["queue_size"] or 2
+		vs = ThreadedCapture(int(src), queueSize=queueSize,
+			dropOldest=True).start()
+		time.sleep(2.0)
+		return vs
+
+	# otherwise, grab a reference to the video file -- decoding still
+	# happens on a background thread, but every frame is kept so no
+	# part of the video is skipped
+	print("[INFO] opening video file {}...".format(src))
+	queueSize = args["queue_size"] or 128
+	return ThreadedCapture(src, queueSize=queueSize,
+		dropOldest=False).start()
+
+def publish_events(src, frameID, item):
+	# send the objects counted on this frame to the event stream (if
+	# any), tagged with the source and frame they were counted on
+	if events is None:
+		return
+
+	for event in item["events"]:
+		events.publish(dict(event, source=str(src), frame=frameID))
+
+def open_writer(path, frame):
+	# initialize the video writer with the dimensions of the frame
+	(H, W) = frame.shape[:2]
+	fourcc = cv2.VideoWriter_fourcc(*"MJPG")
+	return cv2.VideoWriter(path, fourcc, 30, (W, H), True)
+
+def close_stream(vs):
+	# stop the capture thread (which also releases the video file or
+	# camera pointer), reporting any frames dropped from a live source
+	vs.stop()
+	if vs.dropped > 0:
+		print("[INFO] dropped frames: {}".format(vs.dropped))
+
+def count_stream(src):
+	# open the video file or webcam, then load the network for the
+	# size of its frames
+	vs = open_stream(src)
+	load_nets([vs.size])
+
+	# initialize the video writer (we'll instantiate later if need be)
+	writer = None
+
+	# instantiate the people counter holding the centroid tracker, the
+	# dlib correlation trackers and the up/down totals
+	counter = PeopleCounter(maxDisappeared=40, maxDistance=50,
+		assignment=args["assignment"], trackerWorkers=args["tracker_workers"])
+	scheduler = make_scheduler()
+
+	# build the processing pipeline: frames are resized and converted,
+	# sent through the detector on key frames, tracked and counted (in
+	# order, since the trackers carry state from frame to frame) and then
+	# annotated -- every stage runs on its own worker threads connected by
+	# bounded queues
+	stages = [
+		PipelineStage("prepare", prepare_frame, workers=args["prepare_workers"]),
+		PipelineStage("detect", partial(detect_people, scheduler),
+			workers=args["detect_workers"]),
+		PipelineStage("track", partial(track_people, counter, scheduler),
+			ordered=True),
+	]
 
-	# show the output frame
-	cv2.imshow(windowName, frame)
-	key = cv2.waitKey(1) & 0xFF
+	# in headless mode nothing is ever looked at, so skip the drawing
+	if not args["headless"]:
+		stages.append(PipelineStage("render", render_frame,
+			workers=args["render_workers"]))
 
-	# if the `q` key was pressed, break from the loop
-	if key in [ord("q"), 27] or cv2.getWindowProperty(windowName,cv2.WND_PROP_VISIBLE) < 1:
-		break
+	def read_frame():
+		# time how long we wait on the capture thread for a frame
+		with timer.time("read"):
+			return vs.read()
 
-	# increment the total number of frames processed thus far and
-	# then update the FPS counter
-	totalFrames += 1
-	fps.update()
+	pipeline = Pipeline(stages).start(read_frame)
 
-# stop the timer and display FPS information
-fps.stop()
-print("[INFO] elapsed time: {:.2f}".format(fps.elapsed()))
-print("[INFO] approx. FPS: {:.2f}".format(fps.fps()))
+	# start the frames per second throughput estimator
+	fps = FPS().start()
 
-# check to see if we need to release the video writer pointer
-if writer is not None:
-	writer.release()
+	# loop over the annotated frames, which the pipeline hands back in
+	# their original order
+	for (frameID, item) in pipeline.results():
+		frame = item["frame"]
+		publish_events(src, frameID, item)
 
-# if we are not using a video file, stop the camera video stream
-if not args.get("input", False):
-	vs.stop()
+		# if we are supposed to be writing a video to disk, initialize
+		# the writer
+		if args["output"] is not None and writer is None:
+			writer = open_writer(args["output"], frame)
+
+		# check to see if we should write the frame to disk
+		if writer is not None:
+			with timer.time("write"):
+				writer.write(frame)
+
+		# stop if we were asked to
+		if stopEvent.is_set():
+			break
+
+		# print the stage latencies every now and then
+		timer.maybeReport()
+
+		# show the output frame (unless we are running headless)
+		if not args["headless"]:
+			with timer.time("show"):
+				cv2.imshow(windowName, frame)
+				key = cv2.waitKey(1) & 0xFF
 
-# otherwise, release the video file pointer
-else:
-	vs.release()
+			# if the `q` key was pressed, break from the loop
+			if key in [ord("q"), 27] or cv2.getWindowProperty(windowName,cv2.WND_PROP_VISIBLE) < 1:
+				break
 
-# close any open windows
-cv2.destroyAllWindows()
\ No newline at end of file
+		# update the FPS counter
+		fps.update()
+
+	# stop the timer and display FPS information
+	fps.stop()
+	print("[INFO] elapsed time: {:.2f}".format(fps.elapsed()))
+	print("[INFO] approx. FPS: {:.2f}".format(fps.fps()))
+	print("[INFO] up={} down={}".format(counter.totalUp, counter.totalDown))
+
+	# stop the pipeline threads along with any tracker processes
+	pipeline.stop()
+	counter.stop()
+
+	# check to see if we need to release the video writer pointer
+	if writer is not None:
+		writer.release()
+
+	close_stream(vs)
+
+def count_streams(sources):
+	# open every source along with its own people counter, window and
+	# (optional) video writer -- the network is shared by all of them
+	streams = [open_stream(src) for src in sources]
+	load_nets([vs.size for vs in streams])
+	counters = [PeopleCounter(maxDisappeared=40, maxDistance=50,
+		assignment=args["assignment"], trackerWorkers=args["tracker_workers"])
+		for src in sources]
+	schedulers = [make_scheduler() for src in sources]
+	names = ["{} #{}".format(windowName, i) for i in range(0, len(sources))]
+	writers = [None] * len(sources)
+
+	# when writing to disk, every stream gets its own file named after
+	# the output path (e.g., output.avi -> output-0.avi, output-1.avi)
+	if args["output"] is not None:
+		(base, ext) = os.path.splitext(args["output"])
+		paths = ["{}-{}{}".format(base, i, ext) for i in range(0, len(sources))]
+
+	# keep track of the streams that still have frames to give
+	active = list(range(0, len(sources)))
+	totalFrames = 0
+	fps = FPS().start()
+
+	def finish_frames(frameID, items, due, future):
+		# wait for the detections of the frames (if they went through
+		# the network) and hand every stream back its own boxes -- this
+		# only times the wait, the forward pass itself is timed by the
+		# worker running it
+		if future is not None:
+			with timer.time("forward-wait"):
+				assign_batch(due, future.result())
+
+		# track, count and annotate every stream with its own state
+		closed = False
+		for (i, item) in items.items():
+			track_people(counters[i], schedulers[i], frameID, item)
+			publish_events(sources[i], frameID, item)
+			frame = item["frame"]
+			if not args["headless"]:
+				render_frame(frameID, item)
+
+			# check to see if we should write the frame to disk
+			if args["output"] is not None and writers[i] is None:
+				writers[i] = open_writer(paths[i], frame)
+			if writers[i] is not None:
+				with timer.time("write"):
+					writers[i].write(frame)
+
+			# show the output frame (unless we are running headless)
+			if not args["headless"]:
+				with timer.time("show"):
+					cv2.imshow(names[i], frame)
+				if cv2.getWindowProperty(names[i], cv2.WND_PROP_VISIBLE) < 1:
+					closed = True
+
+		# stop if we were asked to
+		if stopEvent.is_set() or closed:
+			return True
+
+		# print the stage latencies every now and then
+		timer.maybeReport()
+
+		# if the `q` key was pressed, break from the loop
+		if not args["headless"]:
+			with timer.time("show"):
+				key = cv2.waitKey(1) & 0xFF
+			if key in [ord("q"), 27]:
+				return True
+
+		# update the FPS counter
+		fps.update()
+		return False
+
+	# the network runs on a worker thread (or asynchronously on the
+	# Inference Engine backend), so the detections of the next frames
+	# are computed while the current ones are tracked -- `pending` holds
+	# the frames submitted to the network but not tracked yet (tiled
+	# frames borrow the networks from the pool instead)
+	detector = AsyncNet(nets.get(), backend, timer) if tiler is None else None
+	pending = None
+	stop = False
+
+	while len(active) > 0:
+		# grab the next frame from every active stream, dropping the
+		# streams that ran out of frames
+		items = {}
+		for i in list(active):
+			with timer.time("read"):
+				frame = streams[i].read()
+			if frame is None:
+				active.remove(i)
+				continue
+
+			items[i] = prepare_frame(totalFrames, frame)
+
+		if len(items) == 0:
+			break
+
+		# with an adaptive schedule, whether a stream is due for a
+		# detection depends on the tracking of its previous frame, so
+		# that one has to be finished first
+		if pending is not None and args["adaptive"]:
+			stop = finish_frames(*pending)
+			pending = None
+			if stop:
+				break
+
+		# submit the frames of *all* the streams due for a detection to
+		# the network at once (tiled frames go through on their own)
+		due = [item for (i, item) in items.items()
+			if schedulers[i].shouldDetect(totalFrames)]
+		future = None
+		if len(due) > 0 and tiler is not None:
+			detect_people_batch(due)
+		elif len(due) > 0:
+			future = detector.submit(totalFrames, batch_blob(due))
+
+		# track the previous frames while the network works on these
+		if pending is not None:
+			stop = finish_frames(*pending)
+			if stop:
+				break
+
+		# increment the total number of frames processed thus far
+		pending = (totalFrames, items, due, future)
+		totalFrames += 1
+
+	# track the last frames
+	if pending is not None and not stop:
+		finish_frames(*pending)
+
+	if detector is not None:
+		detector.close()
+		nets.put(detector.net)
+
+	# stop the timer and display FPS information
+	fps.stop()
+	print("[INFO] elapsed time: {:.2f}".format(fps.elapsed()))
+	print("[INFO] approx. FPS (per stream): {:.2f}".format(fps.fps()))
+
+	# report the counts of every stream and release everything
+	for (i, counter) in enumerate(counters):
+		print("[INFO] stream {}: up={} down={}".format(sources[i],
+			counter.totalUp, counter.totalDown))
+		counter.stop()
+		if writers[i] is not None:
+			writers[i].release()
+		close_stream(streams[i])
+
+# the tracker workers may be started as fresh interpreters that import
+# this script (e.g., on Windows), so everything that actually runs the
+# counter lives under the main guard
+if __name__ == "__main__":
+	# construct the argument parse and parse the arguments
+	ap = argparse.ArgumentParser()
+	ap.add_argument("-p", "--prototxt", required=False, default="model/MobileNetSSD_deploy.prototxt",help="path to Caffe 'deploy' prototxt file")
+	ap.add_argument("-m", "--model", required=False, default="model/MobileNetSSD_deploy.caffemodel",help="path to Caffe pre-trained model")
+	ap.add_argument("-i", "--input", type=str,help="path to optional input video file")
+	ap.add_argument("--sources", type=str, nargs="+",help="video files and/or webcam indexes to count at once with a shared network")
+	ap.add_argument("-o", "--output", type=str,help="path to optional output video file")
+	ap.add_argument("-c", "--confidence", type=float, default=0.4,help="minimum probability to filter weak detections")
+	ap.add_argument("-s", "--skip-frames", type=int, default=30,help="# of skip frames between detections")
+	ap.add_argument("--adaptive", action="store_true",help="adapt the number of skip frames to tracker confidence, motion and the counting line")
+	ap.add_argument("--min-skip", type=int, default=5,help="minimum # of frames between detections in adaptive mode")
+	ap.add_argument("--max-skip", type=int, default=120,help="maximum # of frames between detections in adaptive mode")
+	ap.add_argument("-a", "--assignment", type=str, default="greedy", choices=["greedy", "hungarian"],help="how centroids are matched to tracked objects")
+	ap.add_argument("-q", "--queue-size", type=int, default=None,help="# of decoded frames buffered ahead of processing (default: 128 for files, 2 for the webcam)")
+	ap.add_argument("--prepare-workers", type=int, default=1,help="# of threads resizing and converting frames")
+	ap.add_argument("--detect-workers", type=int, default=1,help="# of threads (each holding its own network) running the detector")
+	ap.add_argument("--render-workers", type=int, default=1,help="# of threads drawing the annotations")
+	ap.add_argument("--tracker-workers", type=int, default=0,help="# of processes sharing the correlation trackers (0 keeps them in this process)")
+	ap.add_argument("--headless", action="store_true",help="do not draw nor open any window (e.g., on servers without a display)")
+	ap.add_argument("-e", "--events", type=str,help="JSON lines file, tcp://host:port or unix:///path socket to stream the counting events to")
+	ap.add_argument("--events-append", action="store_true",help="append to the --events file instead of overwriting it")
+	ap.add_argument("--timing", action="store_true",help="time every stage and report latency percentiles at exit")
+	ap.add_argument("--timing-interval", type=float, default=0,help="also report the stage latencies every N seconds while running")
+	ap.add_argument("--trace", type=str,help="path to an optional Chrome trace (JSON) of every timed stage")
+	ap.add_argument("--tiles", action="store_true",help="detect on overlapping tiles of the full resolution frame (for small people in high resolution footage)")
+	ap.add_argument("--tile-size", type=int, default=600,help="size (in pixels of the original frame) of the square tiles")
+	ap.add_argument("--tile-overlap", type=float, default=0.2,help="fraction of a tile overlapping its neighbours")
+	ap.add_argument("--roi", type=str,help="polygon \"x1,y1 x2,y2 ...\" (original frame pixels) outside of which tiles are skipped (implies --tiles)")
+	ap.add_argument("-f", "--full", required = False, action='store_true', help = "use full screen mode  (optional)")
+	add_dnn_arguments(ap)
+	args = vars(ap.parse_args())
+
+	# enable the stage timer if we are profiling (a trace implies it)
+	timer = StageTimer(enabled=args["timing"] or args["trace"] is not None,
+		reportInterval=args["timing_interval"], trace=args["trace"] is not None)
+
+	# Configure windows (one per source when counting several of them)
+	windowName = "Multi Tracking"
+	names = [windowName] if args["sources"] is None else \
+		["{} #{}".format(windowName, i) for i in range(0, len(args["sources"]))]
+	if (args["full"] and not args["headless"]):
+		for name in names:
+			cv2.namedWindow(name, cv2.WND_PROP_FULLSCREEN)
+			cv2.setWindowProperty(name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+	# build the tiled detector, restricted to the region of interest
+	if args["tiles"] or args["roi"] is not None:
+		roi = parse_polygon(args["roi"]) if args["roi"] is not None else None
+		tiler = TiledDetector(tileSize=args["tile_size"],
+			overlap=args["tile_overlap"], roi=roi)
+
+	# start the (optional) event stream the counted objects are written
+	# to in the background
+	events = None
+	if args["events"] is not None:
+		print("[INFO] streaming events to {}...".format(args["events"]))
+		events = EventStream(args["events"],
+			append=args["events_append"]).start()
+
+	# stop gracefully on Ctrl+C (or when the service is terminated)
+	signal.signal(signal.SIGINT, lambda signum, frame: stopEvent.set())
+	signal.signal(signal.SIGTERM, lambda signum, frame: stopEvent.set())
+
+	# count either several sources at once with batched detection, or
+	# a single video file/webcam through the pipeline
+	if args["sources"] is not None:
+		count_streams(args["sources"])
+	else:
+		count_stream(args.get("input") or 0)
+
+	# report the stage latencies and write the trace (if any)
+	timer.report()
+	if args["trace"] is not None:
+		print("[INFO] writing trace to {}...".format(args["trace"]))
+		timer.writeTrace(args["trace"])
+
+	# flush the remaining events
+	if events is not None:
+		events.stop()
+		if events.dropped > 0:
+			print("[INFO] dropped events: {}".format(events.dropped))
+
+	# close any open windows
+	if not args["headless"]:
+		cv2.destroyAllWindows()
\ No newline at end of file
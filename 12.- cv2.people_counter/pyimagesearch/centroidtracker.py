@@ -1,17 +1,26 @@
 # import the necessary packages
 from scipy.spatial import distance as dist
-from collections import OrderedDict
+from scipy.optimize import linear_sum_assignment
 import numpy as np
 
 class CentroidTracker:
-	def __init__(self, maxDisappeared=50, maxDistance=50):
-		# initialize the next unique object ID along with two ordered
-		# dictionaries used to keep track of mapping a given object
-		# ID to its centroid and number of consecutive frames it has
-		# been marked as "disappeared", respectively
+	def __init__(self, maxDisappeared=50, maxDistance=50, assignment="greedy",
+		capacity=64):
+		# initialize the next unique object ID along with the arrays
+		# holding, for every tracked object (one row each, in the
+		# order they were registered), its object ID, its centroid and
+		# the number of consecutive frames it has been marked as
+		# "disappeared" -- the arrays are preallocated and only grow
+		# (doubling their capacity) when more objects are tracked
 		self.nextObjectID = 0
-		self.objects = OrderedDict()
-		self.disappeared = OrderedDict()
+		self.ids = np.zeros(capacity, dtype="int64")
+		self.centroids = np.zeros((capacity, 2), dtype="int64")
+		self.disappearedCounts = np.zeros(capacity, dtype="int64")
+		self.count = 0
+
+		# keep the IDs deregistered by the last call to `update` so
+		# callers can drop any state they hold for them
+		self.deregisteredIDs = []
 
 		# store the number of maximum consecutive frames a given
 		# object is allowed to be marked as "disappeared" until we
@@ -23,141 +32,187 @@ class CentroidTracker:
 		# distance we'll start to mark the object as "disappeared"
 		self.maxDistance = maxDistance
 
-	def register(self, centroid):
-		# when registering an object we use the next available object
-		# ID to store the centroid
-		self.objects[self.nextObjectID] = centroid
-		self.disappeared[self.nextObjectID] = 0
-		self.nextObjectID += 1
+		# store how input centroids are matched to existing objects:
+		# "greedy" (closest pairs first) or "hungarian" (the optimal
+		# assignment minimizing the total distance)
+		if assignment not in ("greedy", "hungarian"):
+			raise ValueError("unknown assignment: {}".format(assignment))
+		self.assignment = assignment
+
+	@property
+	def objects(self):
+		# map each object ID to (a copy of) its centroid
+		n = self.count
+		return dict(zip(self.ids[:n].tolist(), self.centroids[:n].copy()))
+
+	@property
+	def disappeared(self):
+		# map each object ID to its "disappeared" counter
+		n = self.count
+		return dict(zip(self.ids[:n].tolist(),
+			self.disappearedCounts[:n].tolist()))
+
+	def reserve(self, size):
+		# nothing to do if the arrays are already big enough
+		capacity = len(self.ids)
+		if size <= capacity:
+			return
+
+		# otherwise, keep doubling the capacity until the arrays fit
+		# the requested size and copy the tracked objects over
+		while capacity < size:
+			capacity *= 2
+
+		n = self.count
+		ids = np.zeros(capacity, dtype="int64")
+		centroids = np.zeros((capacity, 2), dtype="int64")
+		disappearedCounts = np.zeros(capacity, dtype="int64")
+		ids[:n] = self.ids[:n]
+		centroids[:n] = self.centroids[:n]
+		disappearedCounts[:n] = self.disappearedCounts[:n]
+		(self.ids, self.centroids) = (ids, centroids)
+		self.disappearedCounts = disappearedCounts
+
+	def register(self, centroids):
+		# when registering objects we use the next available object
+		# IDs to store the centroid(s), appending a row per object
+		centroids = np.asarray(centroids).reshape(-1, 2)
+		k = len(centroids)
+		(start, end) = (self.count, self.count + k)
+		self.reserve(end)
+
+		self.ids[start:end] = np.arange(self.nextObjectID,
+			self.nextObjectID + k)
+		self.centroids[start:end] = centroids
+		self.disappearedCounts[start:end] = 0
+		self.nextObjectID += k
+		self.count = end
 
 	def deregister(self, objectID):
-		# to deregister an object ID we delete the object ID from
-		# both of our respective dictionaries
-		del self.objects[objectID]
-		del self.disappeared[objectID]
+		# to deregister an object ID we drop its row from each of our
+		# respective arrays
+		keep = self.ids[:self.count] != objectID
+		self.compact(keep)
+
+	def compact(self, keep):
+		# nothing to do if every object is kept
+		if keep.all():
+			return
+
+		# otherwise, remember the IDs we are about to drop, then shift
+		# the kept rows to the front of the arrays, preserving their
+		# order
+		self.deregisteredIDs.extend(self.ids[:self.count][~keep].tolist())
+		n = int(keep.sum())
+		self.ids[:n] = self.ids[:self.count][keep]
+		self.centroids[:n] = self.centroids[:self.count][keep]
+		self.disappearedCounts[:n] = self.disappearedCounts[:self.count][keep]
+		self.count = n
 
 	def update(self, rects):
+		# grab the number of objects we are currently tracking and
+		# reset the IDs deregistered on this update
+		n = self.count
+		self.deregisteredIDs = []
+
 		# check to see if the list of input bounding box rectangles
 		# is empty
 		if len(rects) == 0:
-			# loop over any existing tracked objects and mark them
-			# as disappeared
-			for objectID in list(self.disappeared.keys()):
-				self.disappeared[objectID] += 1
-
-				# if we have reached a maximum number of consecutive
-				# frames where a given object has been marked as
-				# missing, deregister it
-				if self.disappeared[objectID] > self.maxDisappeared:
-					self.deregister(objectID)
+			# mark every existing tracked object as disappeared and
+			# deregister those that have reached a maximum number of
+			# consecutive frames marked as missing
+			self.disappearedCounts[:n] += 1
+			self.compact(self.disappearedCounts[:n] <= self.maxDisappeared)
 
 			# return early as there are no centroids or tracking info
 			# to update
 			return self.objects
 
-		# initialize an array of input centroids for the current frame
-		inputCentroids = np.zeros((len(rects), 2), dtype="int")
-
-		# loop over the bounding box rectangles
-		for (i, (startX, startY, endX, endY)) in enumerate(rects):
-			# use the bounding box coordinates to derive the centroid
-			cX = int((startX + endX) / 2.0)
-			cY = int((startY + endY) / 2.0)
-			inputCentroids[i] = (cX, cY)
+		# use the bounding box coordinates to derive the centroids of
+		# all the rectangles at once (truncating like `int` does)
+		rects = np.asarray(rects, dtype="float64").reshape(-1, 4)
+		inputCentroids = np.trunc((rects[:, 0:2] + rects[:, 2:4]) / 2.0)
+		inputCentroids = inputCentroids.astype("int64")
 
 		# if we are currently not tracking any objects take the input
 		# centroids and register each of them
-		if len(self.objects) == 0:
-			for i in range(0, len(inputCentroids)):
-				self.register(inputCentroids[i])
+		if n == 0:
+			self.register(inputCentroids)
+			return self.objects
 
 		# otherwise, are are currently tracking objects so we need to
 		# try to match the input centroids to existing object
-		# centroids
+		# centroids -- compute the distance between each pair of
+		# object centroids and input centroids, respectively
+		D = dist.cdist(self.centroids[:n], inputCentroids)
+
+		# match the rows (objects) to the columns (input centroids)
+		if self.assignment == "hungarian":
+			# pairs farther apart than the maximum distance get a
+			# prohibitive cost so the optimal assignment avoids them
+			cost = np.where(D > self.maxDistance, 1e9, D)
+			(rows, cols) = linear_sum_assignment(cost)
+		else:
+			(rows, cols) = self.greedyMatch(D)
+
+		# do not associate two centroids whose distance is greater
+		# than the maximum distance
+		matched = D[rows, cols] <= self.maxDistance
+		(rows, cols) = (rows[matched], cols[matched])
+
+		# set the new centroid of every matched object and reset its
+		# disappeared counter
+		self.centroids[rows] = inputCentroids[cols]
+		self.disappearedCounts[rows] = 0
+
+		# compute both the row and column indexes we have NOT yet
+		# matched
+		unusedRows = np.ones(D.shape[0], dtype="bool")
+		unusedRows[rows] = False
+		unusedCols = np.ones(D.shape[1], dtype="bool")
+		unusedCols[cols] = False
+
+		# in the event that the number of object centroids is
+		# equal or greater than the number of input centroids
+		# we need to check and see if some of these objects have
+		# potentially disappeared
+		if D.shape[0] >= D.shape[1]:
+			# increment the disappeared counter of the unmatched
+			# objects and deregister those that have been missing for
+			# too many consecutive frames
+			self.disappearedCounts[:n][unusedRows] += 1
+			self.compact(self.disappearedCounts[:n] <= self.maxDisappeared)
+
+		# otherwise, if the number of input centroids is greater
+		# than the number of existing object centroids we need to
+		# register each new input centroid as a trackable object
 		else:
-			# grab the set of object IDs and corresponding centroids
-			objectIDs = list(self.objects.keys())
-			objectCentroids = list(self.objects.values())
-
-			# compute the distance between each pair of object
-			# centroids and input centroids, respectively -- our
-			# goal will be to match an input centroid to an existing
-			# object centroid
-			D = dist.cdist(np.array(objectCentroids), inputCentroids)
-
-			# in order to perform this matching we must (1) find the
-			# smallest value in each row and then (2) sort the row
-			# indexes based on their minimum values so that the row
-			# with the smallest value as at the *front* of the index
-			# list
-			rows = D.min(axis=1).argsort()
-
-			# next, we perform a similar process on the columns by
-			# finding the smallest value in each column and then
-			# sorting using the previously computed row index list
-			cols = D.argmin(axis=1)[rows]
-
-			# in order to determine if we need to update, register,
-			# or deregister an object we need to keep track of which
-			# of the rows and column indexes we have already examined
-			usedRows = set()
-			usedCols = set()
-
-			# loop over the combination of the (row, column) index
-			# tuples
-			for (row, col) in zip(rows, cols):
-				# if we have already examined either the row or
-				# column value before, ignore it
-				if row in usedRows or col in usedCols:
-					continue
-
-				# if the distance between centroids is greater than
-				# the maximum distance, do not associate the two
-				# centroids to the same object
-				if D[row, col] > self.maxDistance:
-					continue
-
-				# otherwise, grab the object ID for the current row,
-				# set its new centroid, and reset the disappeared
-				# counter
-				objectID = objectIDs[row]
-				self.objects[objectID] = inputCentroids[col]
-				self.disappeared[objectID] = 0
-
-				# indicate that we have examined each of the row and
-				# column indexes, respectively
-				usedRows.add(row)
-				usedCols.add(col)
-
-			# compute both the row and column index we have NOT yet
-			# examined
-			unusedRows = set(range(0, D.shape[0])).difference(usedRows)
-			unusedCols = set(range(0, D.shape[1])).difference(usedCols)
-
-			# in the event that the number of object centroids is
-			# equal or greater than the number of input centroids
-			# we need to check and see if some of these objects have
-			# potentially disappeared
-			if D.shape[0] >= D.shape[1]:
-				# loop over the unused row indexes
-				for row in unusedRows:
-					# grab the object ID for the corresponding row
-					# index and increment the disappeared counter
-					objectID = objectIDs[row]
-					self.disappeared[objectID] += 1
-
-					# check to see if the number of consecutive
-					# frames the object has been marked "disappeared"
-					# for warrants deregistering the object
-					if self.disappeared[objectID] > self.maxDisappeared:
-						self.deregister(objectID)
-
-			# otherwise, if the number of input centroids is greater
-			# than the number of existing object centroids we need to
-			# register each new input centroid as a trackable object
-			else:
-				for col in unusedCols:
-					self.register(inputCentroids[col])
+			self.register(inputCentroids[unusedCols])
 
 		# return the set of trackable objects
-		return self.objects
\ No newline at end of file
+		return self.objects
+
+	def greedyMatch(self, D):
+		# in order to perform this matching we must (1) find the
+		# smallest value in each row and then (2) sort the row
+		# indexes based on their minimum values so that the row
+		# with the smallest value as at the *front* of the index
+		# list
+		rows = D.min(axis=1).argsort()
+
+		# next, we perform a similar process on the columns by
+		# finding the smallest value in each column and then
+		# sorting using the previously computed row index list
+		cols = D.argmin(axis=1)[rows]
+
+		# every row appears once, so a (row, column) pair only has to
+		# be dropped when its column was already claimed by an earlier
+		# (closer) row -- keep the first occurrence of each column by
+		# scattering the positions in reverse, so the earliest write
+		# to each column is the one that sticks
+		first = np.full(D.shape[1], -1)
+		positions = np.arange(len(cols))
+		first[cols[::-1]] = positions[::-1]
+		first = np.sort(first[first >= 0])
+
+		return (rows[first], cols[first])
@@ -0,0 +1,107 @@
+# import the necessary packages
+from threading import Thread
+from threading import Lock
+from queue import Queue
+from queue import Full
+import socket
+import json
+import time
+
+class EventStream:
+	def __init__(self, target, queueSize=1024, append=False):
+		# store the target the events are written to: a path to a
+		# JSON lines file, "tcp://host:port" or "unix:///path/to.sock"
+		# for a local socket someone is listening on -- a file is
+		# overwritten unless we are asked to append to it
+		self.target = target
+		self.append = append
+
+		# events are queued by the caller and written out by a
+		# background thread, so a slow disk or consumer never stalls
+		# the frame loop -- if the queue fills up the newest events are
+		# dropped (and counted) rather than blocking -- both the caller
+		# and the writer thread drop events, so the counter is guarded
+		# by a lock
+		self.Q = Queue(maxsize=queueSize)
+		self.dropped = 0
+		self.lock = Lock()
+		self.thread = Thread(target=self.run, args=(), daemon=True)
+
+		# initialize the open file or socket
+		self.file = None
+		self.sock = None
+
+	def start(self):
+		# open the target right away so a bad path or a missing
+		# listener is reported at startup, then start the writer thread
+		self.open()
+		self.thread.start()
+		return self
+
+	def open(self):
+		# connect to a local TCP socket
+		if self.target.startswith("tcp://"):
+			(host, port) = self.target[len("tcp://"):].rsplit(":", 1)
+			self.sock = socket.create_connection((host, int(port)))
+
+		# connect to a UNIX domain socket
+		elif self.target.startswith("unix://"):
+			self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			self.sock.connect(self.target[len("unix://"):])
+
+		# otherwise, write (or append) to a JSON lines file
+		else:
+			self.file = open(self.target, "a" if self.append else "w")
+
+	def publish(self, event):
+		# stamp the event with the current time and queue it
+		event = dict(event, timestamp=time.time())
+		try:
+			self.Q.put_nowait(event)
+		except Full:
+			self.drop()
+
+	def drop(self):
+		# count an event we could not deliver
+		with self.lock:
+			self.dropped += 1
+
+	def run(self):
+		# keep writing events until the `None` sentinel shows up
+		while True:
+			event = self.Q.get()
+			if event is None:
+				break
+
+			line = json.dumps(event) + "\n"
+
+			# write the line to the socket, giving up on the socket
+			# (but not on the counter) if the listener went away
+			if self.sock is not None:
+				try:
+					self.sock.sendall(line.encode("utf-8"))
+				except OSError:
+					self.sock.close()
+					self.sock = None
+					self.drop()
+
+			# or write it to the file, flushing whenever the queue is
+			# drained so the file stays close to real time
+			elif self.file is not None:
+				self.file.write(line)
+				if self.Q.empty():
+					self.file.flush()
+
+			else:
+				self.drop()
+
+	def stop(self):
+		# signal the writer thread to finish the queued events, then
+		# close the file or socket
+		self.Q.put(None)
+		self.thread.join(timeout=5.0)
+
+		if self.file is not None:
+			self.file.close()
+		if self.sock is not None:
+			self.sock.close()
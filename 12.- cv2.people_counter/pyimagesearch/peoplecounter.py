@@ -0,0 +1,107 @@
+# import the necessary packages
+from pyimagesearch.centroidtracker import CentroidTracker
+from pyimagesearch.trackableobject import TrackableObject
+from pyimagesearch.trackerpool import CorrelationTrackers
+from pyimagesearch.trackerpool import TrackerPool
+
+class PeopleCounter:
+	def __init__(self, maxDisappeared=40, maxDistance=50, assignment="greedy",
+		trackerWorkers=0):
+		# instantiate our centroid tracker, then initialize the set of
+		# dlib correlation trackers -- either held in this process or
+		# sharded across `trackerWorkers` worker processes -- followed
+		# by a dictionary to map each unique object ID to a
+		# TrackableObject
+		self.ct = CentroidTracker(maxDisappeared=maxDisappeared,
+			maxDistance=maxDistance, assignment=assignment)
+		self.trackers = CorrelationTrackers() if trackerWorkers < 1 \
+			else TrackerPool(workers=trackerWorkers)
+		self.trackableObjects = {}
+
+		# initialize the total number of objects that have moved
+		# either up or down
+		self.totalDown = 0
+		self.totalUp = 0
+
+		# initialize the list of objects counted on the last update
+		self.events = []
+
+	def startTrackers(self, rgb, boxes):
+		# start a new set of correlation trackers from the detected
+		# bounding boxes
+		self.trackers.start(rgb, boxes)
+
+	def updateTrackers(self, rgb):
+		# update the correlation trackers and return the bounding box
+		# rectangles they report
+		return self.trackers.update(rgb)
+
+	def stop(self):
+		# release the correlation trackers (and any worker processes
+		# holding them)
+		self.trackers.stop()
+
+	def update(self, rects, H):
+		# use the centroid tracker to associate the (1) old object
+		# centroids with (2) the newly computed object centroids
+		objects = self.ct.update(rects)
+		self.events = []
+
+		# loop over the tracked objects
+		for (objectID, centroid) in objects.items():
+			# check to see if a trackable object exists for the
+			# current object ID
+			to = self.trackableObjects.get(objectID, None)
+
+			# if there is no existing trackable object, create one
+			if to is None:
+				to = TrackableObject(objectID, centroid)
+
+			# otherwise, there is a trackable object so we can utilize
+			# it to determine direction
+			else:
+				# the difference between the y-coordinate of the
+				# *current* centroid and the mean of *previous*
+				# centroids will tell us in which direction the object
+				# is moving (negative for 'up' and positive for 'down')
+				direction = centroid[1] - to.meanY()
+				to.append(centroid)
+
+				# check to see if the object has been counted or not
+				if not to.counted:
+					# if the direction is negative (indicating the
+					# object is moving up) AND the centroid is above
+					# the center line, count the object
+					if direction < 0 and centroid[1] < H // 2:
+						self.totalUp += 1
+						to.counted = True
+						self.record(objectID, "up")
+
+					# if the direction is positive (indicating the
+					# object is moving down) AND the centroid is below
+					# the center line, count the object
+					elif direction > 0 and centroid[1] > H // 2:
+						self.totalDown += 1
+						to.counted = True
+						self.record(objectID, "down")
+
+			# store the trackable object in our dictionary
+			self.trackableObjects[objectID] = to
+
+		# forget the trackable objects whose IDs the centroid tracker
+		# deregistered, otherwise long running feeds would keep every
+		# object ever seen around
+		for objectID in self.ct.deregisteredIDs:
+			self.trackableObjects.pop(objectID, None)
+
+		return objects
+
+	def record(self, objectID, direction):
+		# keep an event describing the object that was just counted
+		# along with the running totals
+		self.events.append({
+			"objectID": int(objectID),
+			"direction": direction,
+			"totalUp": self.totalUp,
+			"totalDown": self.totalDown,
+		})
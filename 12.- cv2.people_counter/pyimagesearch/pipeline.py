@@ -0,0 +1,201 @@
+# import the necessary packages
+from threading import Thread
+from threading import Lock
+from queue import Queue
+from queue import Empty
+from queue import Full
+import heapq
+
+# sentinel returned by the queue helpers when the pipeline was stopped
+# while they were waiting
+ABORT = object()
+
+class PipelineStage:
+	def __init__(self, name, func, workers=1, ordered=False):
+		# store the name of the stage and the function applied to each
+		# (frameID, item) pair flowing through it -- the function
+		# returns the item handed over to the next stage
+		self.name = name
+		self.func = func
+
+		# an ordered stage sees the frames strictly in frameID order
+		# (e.g., because it keeps state from one frame to the next),
+		# which only makes sense with a single worker; any other stage
+		# can spread its frames over several worker threads
+		self.ordered = ordered
+		self.workers = 1 if ordered else max(1, workers)
+
+class Pipeline:
+	def __init__(self, stages, queueSize=64):
+		# store the stages and build the bounded queues connecting
+		# them: queue i feeds stage i and the last queue holds the
+		# results waiting to be consumed
+		self.stages = stages
+		self.queues = [Queue(maxsize=queueSize)
+			for i in range(0, len(stages) + 1)]
+
+		# keep track of how many workers of each stage are still
+		# running so the last one can forward the end of the stream
+		self.remaining = [stage.workers for stage in stages]
+		self.lock = Lock()
+
+		# initialize the flag used to abort the pipeline along with
+		# the first error raised by any of the stages
+		self.stopped = False
+		self.error = None
+		self.threads = []
+
+	def start(self, source):
+		# start the thread feeding the pipeline from the `source`
+		# callable (which returns `None` once it runs out of items)
+		# followed by the worker threads of every stage
+		self.threads.append(Thread(target=self.feed, args=(source,),
+			daemon=True))
+
+		for (i, stage) in enumerate(self.stages):
+			for j in range(0, stage.workers):
+				self.threads.append(Thread(target=self.work, args=(i,),
+					name="{}-{}".format(stage.name, j), daemon=True))
+
+		for t in self.threads:
+			t.start()
+
+		return self
+
+	def feed(self, source):
+		# number the items as they enter the pipeline so that ordered
+		# stages and the consumer can put them back in sequence
+		frameID = 0
+
+		try:
+			while not self.stopped:
+				item = source()
+
+				# a `None` item indicates the end of the stream
+				if item is None:
+					break
+
+				if not self.put(self.queues[0], (frameID, item)):
+					return
+
+				frameID += 1
+
+		except Exception as e:
+			self.fail(e)
+			return
+
+		# signal the end of the stream to the first stage
+		self.put(self.queues[0], None)
+
+	def work(self, i):
+		# grab the stage along with its input and output queues
+		stage = self.stages[i]
+		(inputQueue, outputQueue) = (self.queues[i], self.queues[i + 1])
+
+		# ordered stages buffer out-of-order frames in a heap until
+		# the next expected frameID shows up
+		pending = []
+		nextID = 0
+
+		try:
+			while True:
+				packet = self.get(inputQueue)
+
+				# if the pipeline was aborted there is nothing left to
+				# forward
+				if packet is ABORT:
+					return
+
+				# on the end of the stream put the sentinel back for
+				# the sibling workers of this stage and leave the loop
+				if packet is None:
+					self.put(inputQueue, None)
+					break
+
+				# unordered stages process the frames as they come
+				if not stage.ordered:
+					(frameID, item) = packet
+					out = stage.func(frameID, item)
+					if not self.put(outputQueue, (frameID, out)):
+						return
+					continue
+
+				# otherwise, process every buffered frame that is next
+				# in the sequence
+				heapq.heappush(pending, packet)
+				while len(pending) > 0 and pending[0][0] == nextID:
+					(frameID, item) = heapq.heappop(pending)
+					out = stage.func(frameID, item)
+					if not self.put(outputQueue, (frameID, out)):
+						return
+					nextID += 1
+
+		except Exception as e:
+			self.fail(e)
+			return
+
+		# the last worker of the stage to finish forwards the end of
+		# the stream to the next stage
+		with self.lock:
+			self.remaining[i] -= 1
+			last = self.remaining[i] == 0
+
+		if last:
+			self.put(outputQueue, None)
+
+	def results(self):
+		# yield the (frameID, item) results of the last stage in
+		# frameID order, regardless of the order in which the worker
+		# threads finished them
+		pending = []
+		nextID = 0
+
+		while True:
+			packet = self.get(self.queues[-1])
+			if packet is ABORT or packet is None:
+				break
+
+			heapq.heappush(pending, packet)
+			while len(pending) > 0 and pending[0][0] == nextID:
+				yield heapq.heappop(pending)
+				nextID += 1
+
+		# surface any error raised by one of the stages to the caller
+		if self.error is not None:
+			raise self.error
+
+	def put(self, queue, packet):
+		# put the packet in the queue, giving up if the pipeline is
+		# stopped while we are waiting for room
+		while not self.stopped:
+			try:
+				queue.put(packet, timeout=0.1)
+				return True
+			except Full:
+				continue
+
+		return False
+
+	def get(self, queue):
+		# grab the next packet from the queue, giving up if the
+		# pipeline is stopped while we are waiting for one
+		while not self.stopped:
+			try:
+				return queue.get(timeout=0.1)
+			except Empty:
+				continue
+
+		return ABORT
+
+	def fail(self, error):
+		# record the first error and abort the whole pipeline
+		with self.lock:
+			if self.error is None:
+				self.error = error
+			self.stopped = True
+
+	def stop(self):
+		# abort the pipeline and give the threads a chance to exit
+		self.stopped = True
+		for t in self.threads:
+			t.join(timeout=1.0)
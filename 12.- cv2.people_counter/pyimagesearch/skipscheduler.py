@@ -0,0 +1,129 @@
+# import the necessary packages
+import cv2
+
+class SkipScheduler:
+	def __init__(self, skipFrames=30, adaptive=False, minSkip=5, maxSkip=120,
+		lineSkip=10, minConfidence=7.0, spikeFactor=3.0, idleMotion=1.0,
+		lineMargin=30):
+		# store the regular number of frames between two detections
+		# and whether the schedule adapts to the scene -- with a fixed
+		# schedule we detect every `skipFrames` frames, exactly like
+		# the original counter did
+		self.skipFrames = max(1, skipFrames)
+		self.adaptive = adaptive
+
+		# store the bounds of the adaptive schedule: we never detect
+		# more often than every `minSkip` frames nor less often than
+		# every `maxSkip` frames, and use `lineSkip` while objects are
+		# close to the counting line
+		self.minSkip = max(1, min(minSkip, self.skipFrames))
+		self.maxSkip = max(self.skipFrames, maxSkip)
+		self.lineSkip = max(self.minSkip, min(lineSkip, self.skipFrames))
+
+		# store the triggers of an early detection: the lowest dlib
+		# tracker confidence (its peak-to-sidelobe ratio) we still
+		# trust, how many times the average motion energy counts as a
+		# spike, the motion energy below which the scene is idle and
+		# how close to the counting line (in pixels) is "near"
+		self.minConfidence = minConfidence
+		self.spikeFactor = spikeFactor
+		self.idleMotion = idleMotion
+		self.lineMargin = lineMargin
+
+		# initialize the current interval, the number of frames since
+		# the last detection (`None` until the first one), the
+		# thumbnail of the previous frame and the motion statistics
+		self.interval = self.skipFrames
+		self.sinceDetection = None
+		self.prevThumb = None
+		self.motion = 0.0
+		self.avgMotion = None
+
+		# initialize the decision for the next frame along with the
+		# reason behind it
+		self.due = True
+		self.reason = "start"
+
+	def isScheduled(self, frameID):
+		# with a fixed schedule we know ahead of time which frames go
+		# through the detector, which lets the detection stage run
+		# ahead of the trackers
+		return not self.adaptive and frameID % self.skipFrames == 0
+
+	def shouldDetect(self, frameID):
+		# a fixed schedule only depends on the frame ID, an adaptive
+		# one on what happened on the previous frames
+		if not self.adaptive:
+			return self.isScheduled(frameID)
+
+		return self.due
+
+	def measureMotion(self, frame):
+		# the motion energy is the mean absolute difference between
+		# tiny grayscale thumbnails of two consecutive frames
+		(h, w) = frame.shape[:2]
+		thumb = cv2.resize(frame, (64, max(1, int(h * 64 / w))),
+			interpolation=cv2.INTER_AREA)
+		thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+
+		motion = 0.0
+		if self.prevThumb is not None and self.prevThumb.shape == thumb.shape:
+			motion = float(cv2.absdiff(thumb, self.prevThumb).mean())
+
+		self.prevThumb = thumb
+		return motion
+
+	def update(self, frame, detected, confidences, objects, lineY):
+		# nothing to decide on a fixed schedule
+		if not self.adaptive:
+			return
+
+		# measure the motion energy of the frame and check whether it
+		# spikes above its running average
+		self.motion = self.measureMotion(frame)
+		spike = self.avgMotion is not None and self.motion > max(
+			self.idleMotion, self.spikeFactor * self.avgMotion)
+		self.avgMotion = self.motion if self.avgMotion is None else \
+			0.9 * self.avgMotion + 0.1 * self.motion
+		idle = len(objects) == 0 and self.motion < self.idleMotion
+
+		# if the frame went through the detector, restart the count
+		# and back off while the scene stays empty and still --
+		# otherwise go back to the regular schedule
+		if detected:
+			self.sinceDetection = 0
+			if idle:
+				self.interval = min(self.interval * 2, self.maxSkip)
+			else:
+				self.interval = self.skipFrames
+
+		# otherwise, count the frame and leave the back-off as soon as
+		# something starts moving again
+		else:
+			self.sinceDetection += 1
+			if not idle and self.interval > self.skipFrames:
+				self.interval = self.skipFrames
+
+		# check whether the trackers are losing confidence and whether
+		# any object is about to cross the counting line
+		lowConfidence = len(confidences) > 0 and \
+			min(confidences) < self.minConfidence
+		nearLine = any(abs(c[1] - lineY) <= self.lineMargin
+			for c in objects.values())
+
+		# pick the interval for this frame along with its reason: a
+		# drifting tracker or a sudden burst of motion asks for a new
+		# detection as soon as possible, objects near the line for
+		# more frequent ones
+		(interval, self.reason) = (self.interval, "schedule")
+		if lowConfidence:
+			(interval, self.reason) = (self.minSkip, "low confidence")
+		elif spike:
+			(interval, self.reason) = (self.minSkip, "motion spike")
+		elif nearLine:
+			(interval, self.reason) = (self.lineSkip, "near line")
+		elif self.interval > self.skipFrames:
+			self.reason = "idle"
+
+		# decide whether the next frame goes through the detector
+		self.due = self.sinceDetection + 1 >= interval
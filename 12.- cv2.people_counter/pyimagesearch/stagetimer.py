@@ -0,0 +1,151 @@
+# import the necessary packages
+from contextlib import nullcontext
+from threading import Lock
+from threading import get_ident
+import json
+import math
+import time
+
+# the latencies are kept in a histogram with logarithmic buckets (each
+# one 5% wider than the previous) from 1 microsecond up to ~100 seconds,
+# so percentiles are accurate to a few percent in constant memory
+BUCKET_GROWTH = 1.05
+BUCKET_MIN = 1e-6
+NUM_BUCKETS = int(math.log(1e2 / BUCKET_MIN, BUCKET_GROWTH)) + 2
+
+# a single do-nothing context shared by every disabled timer, so timing
+# a stage costs next to nothing when profiling is off
+NULL_CONTEXT = nullcontext()
+
+class StageTimer:
+	def __init__(self, enabled=False, reportInterval=0, trace=False,
+		maxTraceEvents=1000000):
+		# store whether the timer is enabled, how often (in seconds)
+		# the statistics are printed while running (0 to only print
+		# them at exit) and whether every timed span is kept for a
+		# Chrome trace (capped to `maxTraceEvents` spans)
+		self.enabled = enabled
+		self.reportInterval = reportInterval
+		self.trace = trace
+		self.maxTraceEvents = maxTraceEvents
+
+		# initialize the per-stage histograms, counts and totals, the
+		# trace events and the lock guarding them (stages run on
+		# several threads)
+		self.histograms = {}
+		self.counts = {}
+		self.totals = {}
+		self.events = []
+		self.lock = Lock()
+
+		# initialize the time origin of the trace and of the periodic
+		# reports
+		self.origin = time.perf_counter()
+		self.lastReport = self.origin
+
+	def time(self, stage):
+		# return a context manager timing the block it wraps
+		if not self.enabled:
+			return NULL_CONTEXT
+
+		return Span(self, stage)
+
+	def record(self, stage, start, end):
+		# find the histogram bucket of the elapsed time
+		elapsed = end - start
+		bucket = 0
+		if elapsed > BUCKET_MIN:
+			bucket = min(NUM_BUCKETS - 1,
+				int(math.log(elapsed / BUCKET_MIN, BUCKET_GROWTH)) + 1)
+
+		with self.lock:
+			# update the statistics of the stage
+			histogram = self.histograms.get(stage)
+			if histogram is None:
+				histogram = [0] * NUM_BUCKETS
+				self.histograms[stage] = histogram
+				self.counts[stage] = 0
+				self.totals[stage] = 0.0
+
+			histogram[bucket] += 1
+			self.counts[stage] += 1
+			self.totals[stage] += elapsed
+
+			# keep the span as a Chrome trace "complete" event (the
+			# timestamps are in microseconds)
+			if self.trace and len(self.events) < self.maxTraceEvents:
+				self.events.append({"name": stage, "ph": "X",
+					"ts": (start - self.origin) * 1e6, "dur": elapsed * 1e6,
+					"pid": 0, "tid": get_ident()})
+
+	def percentile(self, histogram, count, q):
+		# walk the histogram up to the bucket holding the q-th
+		# percentile and return its upper bound
+		rank = q / 100.0 * count
+		seen = 0
+		for (bucket, n) in enumerate(histogram):
+			seen += n
+			if seen >= rank and n > 0:
+				return BUCKET_MIN * (BUCKET_GROWTH ** bucket)
+
+		return 0.0
+
+	def summary(self):
+		# build the statistics (in milliseconds) of every stage
+		stats = {}
+		with self.lock:
+			for (stage, histogram) in self.histograms.items():
+				count = self.counts[stage]
+				stats[stage] = {
+					"count": count,
+					"mean": self.totals[stage] / count * 1000.0,
+					"p50": self.percentile(histogram, count, 50) * 1000.0,
+					"p95": self.percentile(histogram, count, 95) * 1000.0,
+					"p99": self.percentile(histogram, count, 99) * 1000.0,
+				}
+
+		return stats
+
+	def report(self):
+		# print a table with the latency statistics of every stage
+		if not self.enabled:
+			return
+
+		print("[INFO] {:<12} {:>8} {:>9} {:>9} {:>9} {:>9}".format("stage",
+			"count", "mean ms", "p50 ms", "p95 ms", "p99 ms"))
+		for (stage, s) in self.summary().items():
+			print("[INFO] {:<12} {:>8} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+				stage, s["count"], s["mean"], s["p50"], s["p95"], s["p99"]))
+
+	def maybeReport(self):
+		# print the statistics if the report interval elapsed
+		if not self.enabled or self.reportInterval <= 0:
+			return
+
+		now = time.perf_counter()
+		if now - self.lastReport >= self.reportInterval:
+			self.lastReport = now
+			self.report()
+
+	def writeTrace(self, path):
+		# write the recorded spans as a Chrome trace (open it with
+		# chrome://tracing or https://ui.perfetto.dev)
+		with self.lock:
+			events = list(self.events)
+
+		with open(path, "w") as f:
+			json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+class Span:
+	def __init__(self, timer, stage):
+		# store the timer the span reports to and the stage it times
+		self.timer = timer
+		self.stage = stage
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, *exc):
+		self.timer.record(self.stage, self.start, time.perf_counter())
+		return False
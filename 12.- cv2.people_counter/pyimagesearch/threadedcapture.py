@@ -0,0 +1,116 @@
+# import the necessary packages
+from threading import Thread
+from queue import Queue
+from queue import Empty
+from queue import Full
+import cv2
+
+class ThreadedCapture:
+	def __init__(self, src=0, queueSize=128, dropOldest=None):
+		# open the video source -- an integer is treated as a device
+		# index (i.e., a live camera) and anything else as a path to
+		# a video file
+		self.stream = cv2.VideoCapture(src)
+		self.live = isinstance(src, int)
+
+		# store the size of the frames (0 if the source doesn't report
+		# it), read now since the producer thread owns the stream once
+		# started
+		self.size = (int(self.stream.get(cv2.CAP_PROP_FRAME_WIDTH)),
+			int(self.stream.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+		# a live source must never make the consumer process stale
+		# frames, so by default it drops the *oldest* queued frame
+		# when the queue is full; a file must stay lossless, so the
+		# producer simply blocks until the consumer catches up
+		self.dropOldest = self.live if dropOldest is None else dropOldest
+
+		# initialize the bounded queue used to hand decoded frames
+		# over to the consumer, along with the flags used to signal
+		# the producer thread to stop and the number of frames that
+		# had to be dropped
+		self.Q = Queue(maxsize=max(1, queueSize))
+		self.stopped = False
+		self.dropped = 0
+
+		# initialize the producer thread -- it is a daemon so it will
+		# never keep the interpreter alive on its own
+		self.thread = Thread(target=self.update, args=(), daemon=True)
+
+	def start(self):
+		# start the thread reading frames from the video stream
+		self.thread.start()
+		return self
+
+	def update(self):
+		# keep looping until we are told to stop or the stream runs
+		# out of frames
+		while not self.stopped:
+			# grab (and decode) the next frame from the stream
+			(grabbed, frame) = self.stream.read()
+
+			# if the frame was not grabbed we have reached the end of
+			# the stream (or the camera went away)
+			if not grabbed:
+				break
+
+			# hand the frame over to the consumer
+			self.put(frame)
+
+		# signal the end of the stream to the consumer using a `None`
+		# sentinel, then release the stream from the producer thread
+		# so the decoder is never touched from two threads at once
+		self.put(None)
+		self.stream.release()
+
+	def put(self, frame):
+		# lossless policy: wait for room in the queue, periodically
+		# checking whether the consumer asked us to stop
+		if not self.dropOldest:
+			while not self.stopped:
+				try:
+					self.Q.put(frame, timeout=0.1)
+					return
+				except Full:
+					continue
+			return
+
+		# drop-oldest policy: discard queued frames until there is
+		# room for the newest one (the end-of-stream sentinel is never
+		# discarded since it is only ever put last)
+		while True:
+			try:
+				self.Q.put_nowait(frame)
+				return
+			except Full:
+				try:
+					self.Q.get_nowait()
+					self.dropped += 1
+				except Empty:
+					pass
+
+	def read(self):
+		# return the next frame in the queue, or `None` once the
+		# stream is exhausted or has been stopped
+		while True:
+			try:
+				frame = self.Q.get(timeout=0.1)
+			except Empty:
+				# if the producer is gone there is nothing left to
+				# wait for
+				if self.stopped or not self.thread.is_alive():
+					return None
+				continue
+
+			# keep the sentinel in the queue so that any further
+			# calls to `read` also report the end of the stream
+			if frame is None:
+				self.Q.put(None)
+
+			return frame
+
+	def stop(self):
+		# indicate that the producer thread should be stopped, then
+		# wait for it to finish releasing the stream
+		self.stopped = True
+		self.thread.join(timeout=1.0)
@@ -1,10 +1,43 @@
+# import the necessary packages
+import numpy as np
+
 class TrackableObject:
-	def __init__(self, objectID, centroid):
-		# store the object ID, then initialize a list of centroids
-		# using the current centroid
+	# the attributes are fixed, so skip the per-instance dictionary
+	__slots__ = ("objectID", "history", "count", "ySum", "counted")
+
+	def __init__(self, objectID, centroid, maxHistory=32):
+		# store the object ID, then initialize a fixed-capacity ring
+		# buffer holding the most recent centroids, along with the
+		# number of centroids seen so far and the running sum of their
+		# y-coordinates (so the mean never has to be recomputed over
+		# the whole history)
 		self.objectID = objectID
-		self.centroids = [centroid]
+		self.history = np.zeros((max(1, maxHistory), 2), dtype="int64")
+		self.count = 0
+		self.ySum = 0.0
+		self.append(centroid)
 
 		# initialize a boolean used to indicate if the object has
 		# already been counted or not
-		self.counted = False
\ No newline at end of file
+		self.counted = False
+
+	def append(self, centroid):
+		# overwrite the oldest slot of the ring buffer with the new
+		# centroid and update the running sum
+		self.history[self.count % len(self.history)] = centroid
+		self.ySum += centroid[1]
+		self.count += 1
+
+	def meanY(self):
+		# mean y-coordinate over *every* centroid the object has had
+		return self.ySum / self.count
+
+	@property
+	def centroids(self):
+		# return the buffered centroids, oldest first
+		capacity = len(self.history)
+		if self.count <= capacity:
+			return self.history[:self.count].copy()
+
+		i = self.count % capacity
+		return np.concatenate([self.history[i:], self.history[:i]])
@@ -0,0 +1,225 @@
+# import the necessary packages
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+from multiprocessing import Process
+from multiprocessing import Pipe
+import numpy as np
+import dlib
+
+class CorrelationTrackers:
+	def __init__(self):
+		# initialize the list of dlib correlation trackers along with
+		# the confidence each of them reported on its last update
+		self.trackers = []
+		self.confidences = []
+
+	def __len__(self):
+		return len(self.trackers)
+
+	def start(self, rgb, boxes):
+		# initialize our new set of object trackers
+		self.trackers = []
+		self.confidences = []
+
+		# loop over the detected bounding boxes
+		for (startX, startY, endX, endY) in boxes:
+			# construct a dlib rectangle object from the bounding
+			# box coordinates and then start the dlib correlation
+			# tracker
+			tracker = dlib.correlation_tracker()
+			rect = dlib.rectangle(int(startX), int(startY), int(endX),
+				int(endY))
+			tracker.start_track(rgb, rect)
+
+			# add the tracker to our list of trackers so we can
+			# utilize it during skip frames
+			self.trackers.append(tracker)
+
+	def update(self, rgb):
+		# initialize the list of bounding box rectangles returned by
+		# the correlation trackers along with their confidences
+		rects = []
+		self.confidences = []
+
+		# loop over the trackers
+		for tracker in self.trackers:
+			# update the tracker, keeping the confidence (the peak to
+			# sidelobe ratio) it returns, and grab the updated position
+			self.confidences.append(tracker.update(rgb))
+			pos = tracker.get_position()
+
+			# unpack the position object
+			startX = int(pos.left())
+			startY = int(pos.top())
+			endX = int(pos.right())
+			endY = int(pos.bottom())
+
+			# add the bounding box coordinates to the rectangles list
+			rects.append((startX, startY, endX, endY))
+
+		return rects
+
+	def stop(self):
+		self.trackers = []
+		self.confidences = []
+
+def attach(name):
+	# attach to a shared memory block owned by the parent process: the
+	# parent is the only one to unlink it, so the block must not be
+	# registered with the resource tracker of this process too (which
+	# would unlink it again at exit and warn about a leak)
+	try:
+		return shared_memory.SharedMemory(name=name, track=False)
+	except TypeError:
+		# Python < 3.13 always registers the block, so undo it
+		shm = shared_memory.SharedMemory(name=name)
+		resource_tracker.unregister(shm._name, "shared_memory")
+		return shm
+
+def tracker_worker(conn):
+	# each worker holds its own shard of the correlation trackers and
+	# reads the frames from the shared memory block named by the
+	# parent process
+	trackers = CorrelationTrackers()
+	shm = None
+
+	while True:
+		# wait for the next command from the parent process
+		(command, frame, boxes) = conn.recv()
+
+		# stop the worker, detaching from the shared memory block
+		if command == "stop":
+			break
+
+		# (re)attach to the shared memory block if the parent had to
+		# allocate a new one (only closing, never unlinking, the old
+		# one), then wrap it in a NumPy array without copying the frame
+		(name, shape, dtype) = frame
+		if shm is None or shm.name != name:
+			if shm is not None:
+				shm.close()
+			shm = attach(name)
+		rgb = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+		# start a new set of trackers from the boxes of our shard, or
+		# update the current ones and send back their positions
+		if command == "start":
+			trackers.start(rgb, boxes)
+			conn.send(None)
+
+		elif command == "update":
+			rects = trackers.update(rgb)
+			conn.send((rects, trackers.confidences))
+
+		# drop our view on the frame before the block can be closed
+		del rgb
+
+	if shm is not None:
+		shm.close()
+	conn.close()
+
+class TrackerPool:
+	def __init__(self, workers=2):
+		# initialize the connections to the worker processes, the
+		# worker processes themselves and the number of trackers held
+		# by each of them
+		self.conns = []
+		self.procs = []
+		self.counts = [0] * max(1, workers)
+
+		# initialize the confidences reported by the last update
+		self.confidences = []
+
+		# the frame is handed over to the workers through a shared
+		# memory block rather than being pickled once per worker
+		self.shm = None
+
+		# start the worker processes
+		for i in range(0, len(self.counts)):
+			(parentConn, childConn) = Pipe()
+			p = Process(target=tracker_worker, args=(childConn,),
+				daemon=True)
+			p.start()
+			self.conns.append(parentConn)
+			self.procs.append(p)
+
+	def __len__(self):
+		return sum(self.counts)
+
+	def share(self, rgb):
+		# allocate a (bigger) shared memory block if the frame no
+		# longer fits in the current one
+		if self.shm is None or self.shm.size < rgb.nbytes:
+			self.release()
+			self.shm = shared_memory.SharedMemory(create=True,
+				size=rgb.nbytes)
+
+		# copy the frame into the shared memory block and return the
+		# description the workers need to view it
+		view = np.ndarray(rgb.shape, dtype=rgb.dtype, buffer=self.shm.buf)
+		view[:] = rgb
+		del view
+
+		return (self.shm.name, rgb.shape, rgb.dtype.str)
+
+	def start(self, rgb, boxes):
+		frame = self.share(rgb)
+
+		# shard the boxes in contiguous chunks, one per worker, so that
+		# concatenating the workers' results in worker order gives the
+		# rectangles back in the same order as the boxes
+		chunks = np.array_split(np.arange(len(boxes)), len(self.conns))
+
+		for (i, (conn, idxs)) in enumerate(zip(self.conns, chunks)):
+			shard = [tuple(int(v) for v in boxes[j]) for j in idxs]
+			conn.send(("start", frame, shard))
+			self.counts[i] = len(shard)
+
+		# wait for every worker to start its trackers
+		for conn in self.conns:
+			conn.recv()
+
+		self.confidences = []
+
+	def update(self, rgb):
+		# nothing to do if no trackers are running
+		if len(self) == 0:
+			self.confidences = []
+			return []
+
+		# ask every worker holding trackers to update them on the
+		# shared frame -- they all run concurrently
+		frame = self.share(rgb)
+		busy = [conn for (conn, count) in zip(self.conns, self.counts)
+			if count > 0]
+
+		for conn in busy:
+			conn.send(("update", frame, None))
+
+		# gather the rectangles and confidences in worker order
+		rects = []
+		self.confidences = []
+		for conn in busy:
+			(shardRects, shardConfidences) = conn.recv()
+			rects.extend(shardRects)
+			self.confidences.extend(shardConfidences)
+
+		return rects
+
+	def release(self):
+		# close and remove the current shared memory block (if any)
+		if self.shm is not None:
+			self.shm.close()
+			self.shm.unlink()
+			self.shm = None
+
+	def stop(self):
+		# tell the workers to stop and wait for them to exit, then
+		# remove the shared memory block
+		for conn in self.conns:
+			conn.send(("stop", None, None))
+
+		for p in self.procs:
+			p.join(timeout=1.0)
+
+		self.release()
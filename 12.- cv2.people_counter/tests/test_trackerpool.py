@@ -0,0 +1,36 @@
+# import the necessary packages
+import subprocess
+import textwrap
+import sys
+import os
+import pytest
+
+# the folder of the people counter, which the pool is imported from
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# start the pool on a frame, update it on a bigger one (so the parent
+# has to allocate a new shared memory block) and stop it
+SCRIPT = textwrap.dedent("""
+	import numpy as np
+	from pyimagesearch.trackerpool import TrackerPool
+
+	if __name__ == "__main__":
+		pool = TrackerPool(workers=3)
+		rgb = np.zeros((120, 160, 3), dtype="uint8")
+		pool.start(rgb, [(10, 10, 40, 40), (50, 50, 80, 80), (90, 20, 120, 60)])
+		pool.update(rgb)
+		pool.update(np.zeros((240, 320, 3), dtype="uint8"))
+		pool.stop()
+""")
+
+def test_pool_leaves_no_shared_memory_to_the_resource_tracker():
+	pytest.importorskip("dlib")
+
+	# the resource trackers report at exit on the stderr they inherit,
+	# so reading it to the end waits for all of them
+	result = subprocess.run([sys.executable, "-c", SCRIPT], cwd=FOLDER,
+		capture_output=True, text=True, timeout=60)
+
+	assert result.returncode == 0, result.stderr
+	assert "resource_tracker" not in result.stderr
+	assert "No such file or directory" not in result.stderr
@@ -5,40 +5,57 @@
 # python people_gender.py --image images/hoffman.jpg --full
 
 # Import required modules
-import math
 import argparse
 import cv2
+import sys
+import os
+
+# Make the modules shared by every script (one folder up) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from cvcommon.models import registry
+from cvcommon.dnnbackend import add_dnn_arguments
+from cvcommon.dnnbackend import select_backend
+from cvcommon.postprocess import postprocess
+from cvcommon.asyncinfer import AsyncNet
+from pyimagesearch.facetracker import FaceTracker
 
 # construct the argument parser and parse the arguments
 ap = argparse.ArgumentParser()
 ap.add_argument("-i", "--image", required = False, help = "path to where the image resides  (optional)")
 ap.add_argument("-f", "--full", required = False, action='store_true', help = "use full screen mode  (optional)")
+ap.add_argument("-t", "--ttl", type = int, default = 30, help = "# of frames the age and gender of a face are reused before predicting them again")
+ap.add_argument("--headless", required = False, action='store_true', help = "do not draw nor show anything, only print the labels  (optional)")
+ap.add_argument("-c", "--change", type = float, default = 20.0, help = "change of a face crop (mean absolute difference) forcing a new prediction")
+add_dnn_arguments(ap)
 args = vars(ap.parse_args())
 
-def getFaceBox(net, frame, conf_threshold=0.7):
-    frameOpencvDnn = frame.copy()
-    frameHeight = frameOpencvDnn.shape[0]
-    frameWidth = frameOpencvDnn.shape[1]
-    blob = cv2.dnn.blobFromImage(frameOpencvDnn, 1.0, (300, 300), [104, 117, 123], True, False)
-
-    net.setInput(blob)
-    detections = net.forward()
-    boxes = []
-    for i in range(detections.shape[2]):
-        confidence = detections[0, 0, i, 2]
-        if confidence > conf_threshold:
-            x1 = int(detections[0, 0, i, 3] * frameWidth)
-            y1 = int(detections[0, 0, i, 4] * frameHeight)
-            x2 = int(detections[0, 0, i, 5] * frameWidth)
-            y2 = int(detections[0, 0, i, 6] * frameHeight)
-            boxes.append([x1, y1, x2, y2])
-            cv2.rectangle(frameOpencvDnn, (x1, y1), (x2, y2), (0, 255, 0), int(round(frameHeight/150)), 8)
-    return frameOpencvDnn, boxes
+def faceBlob(frame):
+    # Build the blob of the face detector straight from the frame
+    # (blobFromImage already resizes into a new buffer, so the frame
+    # itself is never copied)
+    return cv2.dnn.blobFromImage(frame, 1.0, (300, 300), [104, 117, 123], True, False)
+
+def extractFaces(detections, frame, conf_threshold=0.7):
+    # Return the boxes and confidences of the detected faces as NumPy
+    # arrays (clipped to the frame, since the faces are cropped from it)
+    (frameHeight, frameWidth) = frame.shape[:2]
+    found = postprocess(detections, frameWidth, frameHeight, conf_threshold, clip=True)
+    return found["box"], found["confidence"]
+
+def drawOverlay(frame, boxes, labels):
+    # Draw the boxes and labels straight on the frame: it is not used
+    # anymore once shown (the faces were already cropped and predicted),
+    # so there is no need to copy it
+    thickness = int(round(frame.shape[0]/150))
+    for ((x1, y1, x2, y2), label) in zip(boxes, labels):
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), thickness, 8)
+        cv2.putText(frame, label, (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2, cv2.LINE_AA)
+    return frame
 
 
 # Configure windows
 windowName = "Gender Detection"
-if (args["full"]):
+if (args["full"] and not args["headless"]):
     cv2.namedWindow(windowName, cv2.WND_PROP_FULLSCREEN)
     cv2.setWindowProperty(windowName, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
 
@@ -58,10 +75,16 @@ MODEL_MEAN_VALUES = (78.4263377603, 87.7689143744, 114.895847746)
 ageList = ['(0-2)', '(4-6)', '(8-12)', '(15-20)', '(25-32)', '(38-43)', '(48-53)', '(60-100)']
 genderList = ['Hombre', 'Mujer']
 
-# Load network
-ageNet = cv2.dnn.readNet(ageModel, ageProto)
-genderNet = cv2.dnn.readNet(genderModel, genderProto)
-faceNet = cv2.dnn.readNet(faceModel, faceProto)
+# Load network (once per process) on the chosen backend, warming each
+# one up with a blank input (every network keeps its own selection, as
+# --dnn-backend auto may pick a different one for each, and the thread
+# count is applied by select_backend itself)
+(ageBackend, ageTarget, _) = select_backend(args, ageModel, ageProto, (1, 3, 227, 227))
+ageNet = registry.load(ageModel, ageProto, warmup=(1, 3, 227, 227), backend=ageBackend, target=ageTarget)
+(genderBackend, genderTarget, _) = select_backend(args, genderModel, genderProto, (1, 3, 227, 227))
+genderNet = registry.load(genderModel, genderProto, warmup=(1, 3, 227, 227), backend=genderBackend, target=genderTarget)
+(faceBackend, faceTarget, _) = select_backend(args, faceModel, faceProto)
+faceNet = registry.load(faceModel, faceProto, warmup=(1, 3, 300, 300), backend=faceBackend, target=faceTarget)
 
 # Open a video file or an image file or a camera stream
 if (args["image"]):
@@ -69,36 +92,104 @@ if (args["image"]):
 else:
     video = cv2.VideoCapture(cv2.CAP_DSHOW)
 
+# Track the faces across frames, so the age and gender of a face are
+# only predicted when it shows up, changes a lot or its labels expire
+tracker = FaceTracker(ttl=args["ttl"], changeThreshold=args["change"])
+
+# Run the networks asynchronously (on worker threads, or natively on
+# the Inference Engine backend): the faces of the next frame are
+# detected while the current one is labelled and shown, and the age
+# and gender networks run side by side
+faceAsync = AsyncNet(faceNet, faceBackend)
+genderAsync = AsyncNet(genderNet, genderBackend)
+ageAsync = AsyncNet(ageNet, ageBackend)
+
 padding = 20
+frameID = 0
+pending = None
 while True:
-    # Read frame
-    if(not args["image"]): (grabbed, frame) = video.read()
-
-    (frameFace, boxes) = getFaceBox(faceNet, frame)
-   
+    # Read the next frame and submit it to the face detector right away
+    # (the image is the only frame when there is one)
+    nextFrame = None
+    if (args["image"]):
+        if frameID == 0:
+            nextFrame = frame
+    else:
+        (grabbed, nextFrame) = video.read()
+        if not grabbed:
+            nextFrame = None
+
+    if nextFrame is not None:
+        submitted = (nextFrame, faceAsync.submit(frameID, faceBlob(nextFrame)))
+        frameID += 1
+
+    # Nothing to label until the first frame is in flight, and nothing
+    # left once the stream ended and the last frame was labelled
+    if pending is None:
+        if nextFrame is None:
+            break
+        pending = submitted
+        continue
+
+    # Label the previous frame while the next one is being detected
+    (frame, future) = pending
+    pending = submitted if nextFrame is not None else None
+    (boxes, confidences) = extractFaces(future.result(), frame)
+
+    # Crop every face (with some padding), skipping the boxes falling
+    # outside of the frame
+    faces = []
+    faceBoxes = []
     for box in boxes:
         face = frame[max(0,box[1]-padding):min(box[3]+padding,frame.shape[0]-1),max(0,box[0]-padding):min(box[2]+padding, frame.shape[1]-1)]
-
-        blob = cv2.dnn.blobFromImage(face, 1.0, (227, 227), MODEL_MEAN_VALUES, swapRB=False)
-        genderNet.setInput(blob)
-        genderPreds = genderNet.forward()
-        gender = genderList[genderPreds[0].argmax()]
-        
-        ageNet.setInput(blob)
-        agePreds = ageNet.forward()
-        age = ageList[agePreds[0].argmax()]
-        
-        label = "{},{}".format(gender, age)
-        cv2.putText(frameFace, label, (box[0], box[1]-10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2, cv2.LINE_AA)
-        cv2.imshow(windowName, frameFace)
-
+        if face.size > 0:
+            faces.append(face)
+            faceBoxes.append(box)
+
+    # Match the faces to their tracks and keep the ones whose age and
+    # gender have to be predicted (again)
+    tracks = tracker.update(faceBoxes)
+    stale = [i for i in range(len(faces)) if tracker.needsPrediction(tracks[i], faces[i])]
+
+    if len(stale) > 0:
+        # Stack all those faces in a single blob and run it once through
+        # each network, so the cost per frame barely grows with the
+        # number of faces -- row j of the predictions is face stale[j]
+        blob = cv2.dnn.blobFromImages([faces[i] for i in stale], 1.0, (227, 227), MODEL_MEAN_VALUES, swapRB=False)
+        genderFuture = genderAsync.submit(future.frameID, blob)
+        ageFuture = ageAsync.submit(future.frameID, blob)
+        genderPreds = genderFuture.result()
+        agePreds = ageFuture.result()
+
+        for (j, i) in enumerate(stale):
+            tracker.setPrediction(tracks[i], faces[i], genderPreds[j], agePreds[j])
+
+    # Label every face with the (smoothed) predictions of its track
+    labels = ["{},{}".format(genderList[track.genderProbs.argmax()], ageList[track.ageProbs.argmax()]) for track in tracks]
+
+    # Without a display only print the labels of the faces which have
+    # just been (re)predicted
+    if (args["headless"]):
+        for i in stale:
+            print("[INFO] face #{}: {}".format(tracks[i].trackID, labels[i]))
+        if (args["image"]):
+            break
+        continue
+
+    frameFace = drawOverlay(frame, faceBoxes, labels)
     cv2.imshow(windowName, frameFace)
     
     key = cv2.waitKey(1)
     if (args["image"] or key in [ord("q"), 27] or cv2.getWindowProperty(windowName,cv2.WND_PROP_VISIBLE) < 1):
         break
 
-if (args["image"]): cv2.waitKey(0)
+if (args["image"] and not args["headless"]): cv2.waitKey(0)
+
+print("[INFO] {} age/gender predictions, {} reused from the face tracks".format(tracker.predicted, tracker.cached))
+
+# stop the inference workers
+for asyncNet in (faceAsync, genderAsync, ageAsync):
+    asyncNet.close()
 
 # close all windows
 cv2.destroyAllWindows()
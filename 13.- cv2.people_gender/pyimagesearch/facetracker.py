@@ -0,0 +1,135 @@
+# import the necessary packages
+import numpy as np
+import cv2
+
+class FaceTrack:
+	def __init__(self, trackID, box):
+		# store the ID and the current box of the face, the number of
+		# consecutive frames it went missing and the number of frames
+		# since its age and gender were last predicted
+		self.trackID = trackID
+		self.box = box
+		self.disappeared = 0
+		self.sincePrediction = 0
+
+		# initialize the thumbnail of the face crop at the last
+		# prediction along with the smoothed gender and age
+		# probabilities (`None` until the first prediction)
+		self.thumb = None
+		self.genderProbs = None
+		self.ageProbs = None
+
+class FaceTracker:
+	def __init__(self, iouThreshold=0.3, maxDisappeared=10, ttl=30,
+		changeThreshold=20.0, smoothing=0.5):
+		# store the minimum overlap for a box to belong to a track and
+		# the number of frames a track may go missing before it is
+		# dropped
+		self.iouThreshold = iouThreshold
+		self.maxDisappeared = maxDisappeared
+
+		# store when the age and gender of a track are predicted again:
+		# after `ttl` frames, or as soon as the face crop changes by more
+		# than `changeThreshold` (mean absolute difference of tiny
+		# grayscale thumbnails), along with the weight of a new
+		# prediction in the smoothed probabilities
+		self.ttl = ttl
+		self.changeThreshold = changeThreshold
+		self.smoothing = smoothing
+
+		# initialize the tracks, the next track ID and the number of
+		# predicted and cached labels
+		self.tracks = []
+		self.nextTrackID = 0
+		self.predicted = 0
+		self.cached = 0
+
+	def iou(self, boxes, others):
+		# compute the intersection over union of every pair of boxes
+		# (as a len(boxes) x len(others) matrix)
+		a = np.array(boxes, dtype="float")[:, None, :]
+		b = np.array(others, dtype="float")[None, :, :]
+		w = np.clip(np.minimum(a[..., 2], b[..., 2]) -
+			np.maximum(a[..., 0], b[..., 0]), 0, None)
+		h = np.clip(np.minimum(a[..., 3], b[..., 3]) -
+			np.maximum(a[..., 1], b[..., 1]), 0, None)
+		inter = w * h
+		areaA = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+		areaB = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+
+		return inter / np.maximum(areaA + areaB - inter, 1e-6)
+
+	def update(self, boxes):
+		# match the boxes to the tracks greedily, best overlap first
+		matches = {}
+		if len(boxes) > 0 and len(self.tracks) > 0:
+			overlaps = self.iou([t.box for t in self.tracks], boxes)
+			usedTracks = set()
+			for idx in np.argsort(-overlaps, axis=None):
+				(row, col) = np.unravel_index(idx, overlaps.shape)
+				if overlaps[row, col] < self.iouThreshold:
+					break
+				if row in usedTracks or col in matches:
+					continue
+				usedTracks.add(row)
+				matches[col] = self.tracks[row]
+
+		# count the frames the unmatched tracks went missing, dropping
+		# the ones which have been gone for too long
+		matched = set(id(t) for t in matches.values())
+		for t in self.tracks:
+			if id(t) not in matched:
+				t.disappeared += 1
+		self.tracks = [t for t in self.tracks
+			if t.disappeared <= self.maxDisappeared]
+
+		# update the matched tracks and start a new track for every
+		# other box, returning the track of every box
+		tracks = []
+		for (i, box) in enumerate(boxes):
+			track = matches.get(i)
+			if track is None:
+				track = FaceTrack(self.nextTrackID, box)
+				self.nextTrackID += 1
+				self.tracks.append(track)
+			else:
+				track.box = box
+				track.disappeared = 0
+				track.sincePrediction += 1
+			tracks.append(track)
+
+		return tracks
+
+	def thumbnail(self, face):
+		# a tiny grayscale version of the face crop, enough to tell
+		# whether it changed a lot
+		gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+		return cv2.resize(gray, (16, 16), interpolation=cv2.INTER_AREA)
+
+	def needsPrediction(self, track, face):
+		# predict the age and gender of new tracks and of tracks whose
+		# prediction expired
+		if track.genderProbs is None or track.sincePrediction >= self.ttl:
+			return True
+
+		# or whose face changed a lot since the last prediction
+		change = cv2.absdiff(self.thumbnail(face), track.thumb).mean()
+		if change > self.changeThreshold:
+			return True
+
+		self.cached += 1
+		return False
+
+	def setPrediction(self, track, face, genderProbs, ageProbs):
+		# blend the new probabilities into the smoothed ones, so a
+		# single odd prediction doesn't flip the labels
+		if track.genderProbs is None:
+			(track.genderProbs, track.ageProbs) = (genderProbs, ageProbs)
+		else:
+			a = self.smoothing
+			track.genderProbs = a * genderProbs + (1 - a) * track.genderProbs
+			track.ageProbs = a * ageProbs + (1 - a) * track.ageProbs
+
+		track.thumb = self.thumbnail(face)
+		track.sincePrediction = 0
+		self.predicted += 1
@@ -1,78 +1,301 @@
 # USAGE
 # python deep_learning_object_detection.py --image images/images-001.jpg --full
 # python deep_learning_object_detection.py --image images/celemin.jpg --full
+#
+# To label a whole directory of images (JSON lines or CSV, by extension):
+# python deep_learning_object_detection.py --input-dir images --output output/detections.jsonl
+# python deep_learning_object_detection.py --input-dir images --output output/detections.csv --annotated-dir output/annotated --workers 4 --batch-size 16
+#
+# To find small objects in high resolution images (optionally only within
+# a region of interest):
+# python deep_learning_object_detection.py --image images/images-001.jpg --tiles --tile-size 600
+# python deep_learning_object_detection.py --image images/images-001.jpg --roi "0,200 1200,200 1200,900 0,900"
 
 # import the necessary packages
+from multiprocessing import Pool
 import numpy as np
 import argparse
+import json
+import time
+import csv
 import cv2
+import sys
+import os
 
-# construct the argument parse and parse the arguments
-ap = argparse.ArgumentParser()
-ap.add_argument("-i", "--image", required=True,help="path to input image")
-ap.add_argument("-p", "--prototxt", required=False,default="models/MobileNetSSD_deploy.prototxt.txt", help="path to Caffe 'deploy' prototxt file")
-ap.add_argument("-m", "--model", required=False,default="models/MobileNetSSD_deploy.caffemodel",help="path to Caffe pre-trained model")
-ap.add_argument("-c", "--confidence", type=float, default=0.2,help="minimum probability to filter weak detections")
-ap.add_argument("-f", "--full", required = False, action='store_true', help = "use full screen mode  (optional)")
-args = vars(ap.parse_args())
+# make the modules shared by every script (one folder up) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from cvcommon.models import registry
+from cvcommon.dnnbackend import add_dnn_arguments
+from cvcommon.dnnbackend import select_backend
+from cvcommon.tiling import TiledDetector
+from cvcommon.tiling import parse_polygon
+from cvcommon.postprocess import postprocess
 
 # initialize the list of class labels MobileNet SSD was trained to
 # detect, then generate a set of bounding box colors for each class
+# (seeded, so a class gets the same color on every run and worker)
 CLASSES = ["background", "aeroplane", "bicycle", "bird", "boat",
 	"bottle", "bus", "car", "cat", "chair", "cow", "diningtable",
 	"dog", "horse", "motorbike", "person", "pottedplant", "sheep",
 	"sofa", "train", "tvmonitor"]
-COLORS = np.random.uniform(0, 255, size=(len(CLASSES), 3))
-
-# load our serialized model from disk
-print("[INFO] loading model...")
-net = cv2.dnn.readNetFromCaffe(args["prototxt"], args["model"])
-
-# Configure windows
-windowName = "Multi Tracking"
-if (args["full"]):
-    cv2.namedWindow(windowName, cv2.WND_PROP_FULLSCREEN)
-    cv2.setWindowProperty(windowName, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-
-# load the input image and construct an input blob for the image
-# by resizing to a fixed 300x300 pixels and then normalizing it
-# (note: normalization is done via the authors of the MobileNet SSD
-# implementation)
-image = cv2.imread(args["image"])
-(h, w) = image.shape[:2]
-blob = cv2.dnn.blobFromImage(cv2.resize(image, (300, 300)), 0.007843, (300, 300), 127.5)
-
-# pass the blob through the network and obtain the detections and
-# predictions
-print("[INFO] computing object detections...")
-net.setInput(blob)
-detections = net.forward()
-
-# loop over the detections
-for i in np.arange(0, detections.shape[2]):
-	# extract the confidence (i.e., probability) associated with the
-	# prediction
-	confidence = detections[0, 0, i, 2]
-
-	# filter out weak detections by ensuring the `confidence` is
-	# greater than the minimum confidence
-	if confidence > args["confidence"]:
-		# extract the index of the class label from the `detections`,
-		# then compute the (x, y)-coordinates of the bounding box for
-		# the object
-		idx = int(detections[0, 0, i, 1])
-		box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-		(startX, startY, endX, endY) = box.astype("int")
-
-		# display the prediction
-		label = "{}: {:.2f}%".format(CLASSES[idx], confidence * 100)
-		print("[INFO] {}".format(label))
+COLORS = np.random.RandomState(42).uniform(0, 255, size=(len(CLASSES), 3))
+
+# the extensions of the files picked up in batch mode
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# the network of a batch worker process along with the settings of the
+# batch and the (optional) tiled detector (set by `init_worker`)
+net = None
+settings = None
+tiler = None
+
+def make_blob(images):
+	# construct an input blob for the images by resizing them to a
+	# fixed 300x300 pixels and then normalizing them (note:
+	# normalization is done via the authors of the MobileNet SSD
+	# implementation)
+	resized = [cv2.resize(image, (300, 300)) for image in images]
+	return cv2.dnn.blobFromImages(resized, 0.007843, (300, 300), 127.5)
+
+def annotate(image, found):
+	# draw the bounding box and label of every detection
+	for d in found:
+		(idx, (startX, startY, endX, endY)) = (d["classID"], d["box"])
+		label = "{}: {:.2f}%".format(CLASSES[idx], d["confidence"] * 100)
 		cv2.rectangle(image, (startX, startY), (endX, endY),
 			COLORS[idx], 2)
 		y = startY - 15 if startY - 15 > 15 else startY + 15
 		cv2.putText(image, label, (startX, y),
 			cv2.FONT_HERSHEY_SIMPLEX, 0.5, COLORS[idx], 2)
 
-# show the output image
-cv2.imshow(windowName, image)
-cv2.waitKey(0)
\ No newline at end of file
+def make_tiler(args):
+	# build the tiled detector if tiling was asked for (a region of
+	# interest implies it)
+	if not args["tiles"] and args["roi"] is None:
+		return None
+
+	roi = parse_polygon(args["roi"]) if args["roi"] is not None else None
+	return TiledDetector(tileSize=args["tile_size"],
+		overlap=args["tile_overlap"], roi=roi)
+
+def list_images(inputDir):
+	# walk the directory (in a stable order) yielding the path of every
+	# image, without building the whole list up front
+	for (root, dirs, files) in os.walk(inputDir):
+		dirs.sort()
+		for name in sorted(files):
+			if name.lower().endswith(IMAGE_EXTENSIONS):
+				yield os.path.join(root, name)
+
+def batches(paths, size):
+	# group the paths in lists of (up to) `size` paths
+	batch = []
+	for path in paths:
+		batch.append(path)
+		if len(batch) == size:
+			yield batch
+			batch = []
+
+	if len(batch) > 0:
+		yield batch
+
+def init_worker(prototxt, model, batchSettings):
+	# every worker process loads its own copy of the network once
+	# (on the backend picked by the parent process)
+	global net, settings, tiler
+	if batchSettings["threads"] > 0:
+		cv2.setNumThreads(batchSettings["threads"])
+	net = registry.load(model, prototxt, warmup=(1, 3, 300, 300),
+		backend=batchSettings["backend"], target=batchSettings["target"])
+	settings = batchSettings
+	tiler = make_tiler(batchSettings)
+
+def forward_batch(images):
+	# pass all the images of the batch through the network at once --
+	# the first column of every detection is the index of its image
+	if settings["batched"]:
+		try:
+			net.setInput(make_blob(images))
+			return net.forward()[0, 0]
+
+		# some networks can't take more than one image per blob, in
+		# which case this worker falls back to one image at a time
+		except cv2.error:
+			print("[WARN] the network can't run batches, using single images")
+			settings["batched"] = False
+
+	detections = []
+	for (i, image) in enumerate(images):
+		net.setInput(make_blob([image]))
+		d = net.forward()[0, 0].copy()
+		d[:, 0] = i
+		detections.append(d)
+
+	return np.concatenate(detections)
+
+def detect_batch(paths):
+	# load the images of the batch, keeping track of the unreadable ones
+	images = []
+	results = []
+	for path in paths:
+		image = cv2.imread(path)
+		if image is None:
+			results.append({"image": path, "error": "unreadable image"})
+		else:
+			images.append((path, image))
+
+	if len(images) == 0:
+		return results
+
+	# with tiling the tiles of every image fill a batch on their own,
+	# otherwise all the images of the batch go through at once
+	if tiler is None:
+		detections = forward_batch([image for (path, image) in images])
+
+	for (i, (path, image)) in enumerate(images):
+		(h, w) = image.shape[:2]
+		if tiler is not None:
+			found = tiler.detect(net, image, settings["confidence"])
+		else:
+			found = postprocess(detections[detections[:, 0] == i], w, h,
+				settings["confidence"])
+		results.append({"image": path, "width": w, "height": h,
+			"detections": [{"label": CLASSES[d["classID"]],
+			"confidence": float(d["confidence"]), "box": d["box"].tolist()}
+			for d in found]})
+
+		# write the annotated image under the same relative path
+		if settings["annotated_dir"] is not None:
+			annotate(image, found)
+			outputPath = os.path.join(settings["annotated_dir"],
+				os.path.relpath(path, settings["input_dir"]))
+			os.makedirs(os.path.dirname(outputPath), exist_ok=True)
+			cv2.imwrite(outputPath, image)
+
+	return results
+
+def run_batch(args):
+	# open the output file, JSON lines (one line per image) or CSV (one
+	# row per detection) depending on its extension
+	outputDir = os.path.dirname(os.path.abspath(args["output"]))
+	os.makedirs(outputDir, exist_ok=True)
+	f = open(args["output"], "w", newline="")
+	writer = None
+	if args["output"].lower().endswith(".csv"):
+		writer = csv.writer(f)
+		writer.writerow(["image", "label", "confidence", "startX", "startY",
+			"endX", "endY"])
+
+	# stream the batches of images through the worker processes,
+	# writing the results of every batch in the order of the input (so
+	# the output is the same from one run to the next)
+	(backend, target, threads) = select_backend(args, args["model"],
+		args["prototxt"])
+	batchSettings = {"confidence": args["confidence"], "batched": True,
+		"input_dir": args["input_dir"], "annotated_dir": args["annotated_dir"],
+		"backend": backend, "target": target, "threads": threads,
+		"tiles": args["tiles"], "tile_size": args["tile_size"],
+		"tile_overlap": args["tile_overlap"], "roi": args["roi"]}
+	pool = Pool(processes=args["workers"], initializer=init_worker,
+		initargs=(args["prototxt"], args["model"], batchSettings))
+	(processed, failed, found) = (0, 0, 0)
+	start = time.time()
+
+	for results in pool.imap(detect_batch,
+		batches(list_images(args["input_dir"]), args["batch_size"])):
+		for result in results:
+			processed += 1
+			if "error" in result:
+				failed += 1
+				print("[WARN] {}: {}".format(result["image"], result["error"]))
+				continue
+
+			found += len(result["detections"])
+			if writer is None:
+				f.write(json.dumps(result) + "\n")
+			else:
+				for d in result["detections"]:
+					writer.writerow([result["image"], d["label"],
+						"{:.4f}".format(d["confidence"])] + d["box"])
+
+		# show the progress every thousand images or so
+		if processed % 1000 < args["batch_size"]:
+			print("[INFO] {} images processed ({:.1f} images/s)".format(
+				processed, processed / max(time.time() - start, 1e-6)))
+
+	pool.close()
+	pool.join()
+	f.close()
+
+	print("[INFO] {} images ({} unreadable), {} detections in {:.1f}s".format(
+		processed, failed, found, time.time() - start))
+
+def run_image(args):
+	# load our serialized model from disk, warming it up with a blank
+	# image so the forward pass we time below is a regular one
+	print("[INFO] loading model...")
+	(backend, target, threads) = select_backend(args, args["model"],
+		args["prototxt"])
+	net = registry.load(args["model"], args["prototxt"], warmup=(1, 3, 300, 300),
+		backend=backend, target=target)
+
+	# Configure windows
+	windowName = "Multi Tracking"
+	if (args["full"]):
+		cv2.namedWindow(windowName, cv2.WND_PROP_FULLSCREEN)
+		cv2.setWindowProperty(windowName, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+	# load the input image
+	image = cv2.imread(args["image"])
+	(h, w) = image.shape[:2]
+	tiler = make_tiler(args)
+
+	# pass the image (or its tiles) through the network and obtain the
+	# detections and predictions
+	print("[INFO] computing object detections...")
+	if tiler is not None:
+		found = tiler.detect(net, image, args["confidence"])
+	else:
+		net.setInput(make_blob([image]))
+		detections = net.forward()[0, 0]
+		found = postprocess(detections, w, h, args["confidence"])
+
+	# display the predictions
+	for d in found:
+		print("[INFO] {}: {:.2f}%".format(CLASSES[d["classID"]],
+			d["confidence"] * 100))
+	annotate(image, found)
+
+	# show the output image
+	cv2.imshow(windowName, image)
+	cv2.waitKey(0)
+
+# the batch workers import this module, so everything that actually
+# runs lives under the main guard
+if __name__ == "__main__":
+	# construct the argument parse and parse the arguments
+	ap = argparse.ArgumentParser()
+	ap.add_argument("-i", "--image", required=False,help="path to input image")
+	ap.add_argument("-d", "--input-dir", required=False,help="path to a directory of images to label in batch mode")
+	ap.add_argument("-o", "--output", type=str, default="output/detections.jsonl",help="path to the batch mode output (.jsonl or .csv)")
+	ap.add_argument("-a", "--annotated-dir", type=str, default=None,help="path to a directory for the annotated images of batch mode (optional)")
+	ap.add_argument("-w", "--workers", type=int, default=os.cpu_count(),help="# of worker processes of batch mode")
+	ap.add_argument("-b", "--batch-size", type=int, default=8,help="# of images passed through the network at once in batch mode")
+	ap.add_argument("-p", "--prototxt", required=False,default="models/MobileNetSSD_deploy.prototxt.txt", help="path to Caffe 'deploy' prototxt file")
+	ap.add_argument("-m", "--model", required=False,default="models/MobileNetSSD_deploy.caffemodel",help="path to Caffe pre-trained model")
+	ap.add_argument("-c", "--confidence", type=float, default=0.2,help="minimum probability to filter weak detections")
+	ap.add_argument("--tiles", action="store_true",help="detect on overlapping tiles of the image (for small objects in high resolution images)")
+	ap.add_argument("--tile-size", type=int, default=600,help="size (in pixels of the image) of the square tiles")
+	ap.add_argument("--tile-overlap", type=float, default=0.2,help="fraction of a tile overlapping its neighbours")
+	ap.add_argument("--roi", type=str,help="polygon \"x1,y1 x2,y2 ...\" (image pixels) outside of which tiles are skipped (implies --tiles)")
+	ap.add_argument("-f", "--full", required = False, action='store_true', help = "use full screen mode  (optional)")
+	add_dnn_arguments(ap)
+	args = vars(ap.parse_args())
+
+	if (args["image"] is None) == (args["input_dir"] is None):
+		ap.error("either --image or --input-dir is required")
+
+	if args["input_dir"] is not None:
+		run_batch(args)
+	else:
+		run_image(args)
@@ -16,6 +16,13 @@ import cv2
 import sys
 import os
 
+# make the modules shared by every script (one folder up) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from cvcommon.models import registry
+from cvcommon.dnnbackend import add_dnn_arguments
+from cvcommon.dnnbackend import select_backend
+from cvcommon.postprocess import postprocess
+
 def overlay_image(bg, fg, fgMask, coords):
 	# grab the foreground spatial dimensions (width and height),
 	# then unpack the coordinates tuple (i.e., where in the image
@@ -87,6 +94,7 @@ ap.add_argument("-i", "--image", required=True,
 	help="path to input image")
 ap.add_argument("-o", "--output", required=True,
 	help="path to output GIF")
+add_dnn_arguments(ap)
 args = vars(ap.parse_args())
 
 # load the JSON configuration file and the "Deal With It" sunglasses
@@ -103,8 +111,11 @@ os.makedirs(config["temp_dir"])
 
 # load our OpenCV face detector and dlib facial landmark predictor
 print("[INFO] loading models...")
-detector = cv2.dnn.readNetFromCaffe(config["face_detector_prototxt"],
-	config["face_detector_weights"])
+(backend, target, threads) = select_backend(args,
+	config["face_detector_weights"], config["face_detector_prototxt"])
+detector = registry.load(config["face_detector_weights"],
+	config["face_detector_prototxt"], warmup=(1, 3, 300, 300),
+	backend=backend, target=target)
 predictor = dlib.shape_predictor(config["landmark_predictor"])
 
 # load the input image and construct an input blob from the image
@@ -118,20 +129,18 @@ print("[INFO] computing object detections...")
 detector.setInput(blob)
 detections = detector.forward()
 
-# we'll assume there is only one face we'll be applying the "Deal
-# With It" sunglasses to so let's find the detection with the largest
-# probability
-i = np.argmax(detections[0, 0, :, 2])
-confidence = detections[0, 0, i, 2]
-
-# filter out weak detections
-if confidence < config["min_confidence"]:
+# filter out weak detections (keeping the ones right at the minimum
+# confidence), scaling the boxes to the image size
+found = postprocess(detections, W, H, config["min_confidence"],
+	inclusive=True)
+if len(found) == 0:
 	print("[INFO] no reliable faces found")
 	sys.exit(0)
 
-# compute the (x, y)-coordinates of the bounding box for the face
-box = detections[0, 0, i, 3:7] * np.array([W, H, W, H])
-(startX, startY, endX, endY) = box.astype("int")
+# we'll assume there is only one face we'll be applying the "Deal
+# With It" sunglasses to so let's grab the bounding box of the
+# detection with the largest probability
+(startX, startY, endX, endY) = found["box"][np.argmax(found["confidence"])]
 
 # construct a dlib rectangle object from our bounding box coordinates
 # and then determine the facial landmarks for the face region
@@ -0,0 +1,420 @@
+# USAGE
+# Run every benchmark headless over the bundled assets and save the results:
+# python benchmarks/run_benchmarks.py --output results/base.json
+# python benchmarks/run_benchmarks.py --only haar_faces haar_cats --repeat 3 --output results/new.json
+#
+# Compare two runs, exiting with an error if anything got slower:
+# python benchmarks/run_benchmarks.py --compare results/base.json results/new.json --threshold 0.10
+
+# import the necessary packages
+from multiprocessing import Process
+from multiprocessing import Queue
+from queue import Empty
+import importlib.util
+import numpy as np
+import argparse
+import platform
+import json
+import glob
+import time
+import sys
+import os
+import cv2
+
+# the benchmarks run from any directory, the assets are found relative
+# to the root of the repository
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from cvcommon.cascadeprofiles import add_profile_argument
+from cvcommon.cascadeprofiles import cascade_params
+from cvcommon.postprocess import postprocess
+from cvcommon.motiongate import MotionGate
+
+# initialize the list of class labels MobileNet SSD was trained to
+# detect
+CLASSES = ["background", "aeroplane", "bicycle", "bird", "boat",
+	"bottle", "bus", "car", "cat", "chair", "cow", "diningtable",
+	"dog", "horse", "motorbike", "person", "pottedplant", "sheep",
+	"sofa", "train", "tvmonitor"]
+
+class SkipBenchmark(Exception):
+	# raised by a benchmark whose models or packages are not available
+	pass
+
+def asset(*parts):
+	# build the absolute path of a bundled asset
+	return os.path.join(ROOT, *parts)
+
+def require(path):
+	# skip the benchmark if a (non-bundled) model file is missing
+	if not os.path.exists(path):
+		raise SkipBenchmark("missing {}".format(os.path.relpath(path, ROOT)))
+	return path
+
+def load_script(*parts):
+	# import a script (everything it runs is under its main guard) so
+	# the benchmarks use its own parameters and functions rather than a
+	# copy of them
+	path = asset(*parts)
+	name = os.path.splitext(os.path.basename(path))[0]
+	spec = importlib.util.spec_from_file_location("bench_" + name, path)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+def read_frames(path, maxFrames):
+	# decode (up to `maxFrames`) frames of a video up front, so the
+	# benchmarks time the processing rather than the decoding
+	video = cv2.VideoCapture(path)
+	frames = []
+	while maxFrames <= 0 or len(frames) < maxFrames:
+		(grabbed, frame) = video.read()
+		if not grabbed:
+			break
+		frames.append(frame)
+	video.release()
+	return frames
+
+def haar_images(script, pattern, cascade, opts):
+	# the same pipeline as the 05.- scripts: grayscale conversion and
+	# a single detectMultiScale call per image, with the parameters of
+	# the script (or of the --profile it would be run with)
+	folder = "05.- cv2.img_faces_detection"
+	params = cascade_params(opts["profile"], cascade,
+		load_script(folder, script).DETECT_PARAMS)
+	classifier = cv2.CascadeClassifier(asset(folder, "classifiers", cascade))
+	images = [cv2.imread(p) for p in sorted(glob.glob(asset(folder, "images",
+		pattern)))]
+
+	def step(image):
+		gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+		return len(classifier.detectMultiScale(gray, **params))
+
+	return (images, step)
+
+def bench_haar_faces(opts):
+	return haar_images("img_faces_detection.py", "people-*.jpg",
+		"haarcascade_frontalface_default.xml", opts)
+
+def bench_haar_cats(opts):
+	return haar_images("img_cats_detection.py", "cats-*.jpg",
+		"haarcascade_frontalcatface.xml", opts)
+
+def bench_haar_video(opts):
+	# the same pipeline as video_faces_detection.py, motion gate
+	# included unless --no-gate is given (as for the script)
+	folder = "06.- cv2.video_faces_detection"
+	cascade = "haarcascade_frontalface_default.xml"
+	params = cascade_params(opts["profile"], cascade,
+		load_script(folder, "video_faces_detection.py").DETECT_PARAMS)
+	classifier = cv2.CascadeClassifier(asset(folder, "classifiers", cascade))
+	frames = read_frames(asset(folder, "videos", "politics.mp4"),
+		opts["max_frames"])
+	gate = None if opts["no_gate"] else MotionGate()
+
+	def detectFaces(gray):
+		return classifier.detectMultiScale(gray, **params)
+
+	def step(frame):
+		gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+		faces = detectFaces(gray) if gate is None else gate.detect(gray,
+			detectFaces)
+		return len(faces)
+
+	return (frames, step)
+
+def bench_ssd_images(opts):
+	# the same pipeline as deep_learning_object_detection.py, with its
+	# own blob construction and default confidence
+	folder = "14.- cv2.best_detector"
+	script = load_script(folder, "deep_learning_object_detection.py")
+	net = cv2.dnn.readNetFromCaffe(
+		require(asset(folder, "models", "MobileNetSSD_deploy.prototxt.txt")),
+		require(asset(folder, "models", "MobileNetSSD_deploy.caffemodel")))
+	images = [cv2.imread(p) for p in sorted(glob.glob(asset(folder, "images",
+		"*.jpg")))]
+
+	def step(image):
+		(h, w) = image.shape[:2]
+		net.setInput(script.make_blob([image]))
+		detections = net.forward()[0, 0]
+		return len(postprocess(detections, w, h, 0.2))
+
+	return (images, step)
+
+def create_tracker(name):
+	# OpenCV moved the trackers around between releases, so look for
+	# the factory in the main module first and then in `legacy`
+	factory = "Tracker{}_create".format(name.upper() if name in
+		("csrt", "kcf", "mil", "tld", "mosse") else name.capitalize())
+	for module in (cv2, getattr(cv2, "legacy", None)):
+		if module is not None and hasattr(module, factory):
+			return getattr(module, factory)()
+
+	raise SkipBenchmark("tracker {} not available".format(name))
+
+def bench_multi_object_tracking(opts):
+	# the same pipeline as multi_object_tracking.py, with the trackers
+	# seeded on a fixed grid of boxes instead of interactive selections
+	paths = sorted(glob.glob(asset("11.- cv2.multi_obj_tracking", "videos",
+		"*.mp4")))
+	frames = []
+	for p in paths:
+		frames.extend([(p, f) for f in read_frames(p, opts["max_frames"])])
+	state = {"path": None, "trackers": []}
+
+	def step(item):
+		(path, frame) = item
+
+		# (re)start the trackers on the first frame of every video
+		if path != state["path"]:
+			(H, W) = frame.shape[:2]
+			state["path"] = path
+			state["trackers"] = []
+			for (x, y) in ((0.25, 0.25), (0.75, 0.25), (0.25, 0.75), (0.75, 0.75)):
+				tracker = create_tracker(opts["tracker"])
+				box = (int(W * x) - W // 20, int(H * y) - H // 10, W // 10, H // 5)
+				tracker.init(frame, box)
+				state["trackers"].append(tracker)
+			return len(state["trackers"])
+
+		# count the trackers that still report their object
+		return sum(1 for t in state["trackers"] if t.update(frame)[0])
+
+	return (frames, step)
+
+def bench_people_counter(opts):
+	# the same pipeline as people_counter.py (single thread, fixed
+	# schedule of 30 skip frames) over the multi tracking videos
+	folder = asset("12.- cv2.people_counter")
+	sys.path.insert(0, folder)
+	try:
+		from pyimagesearch.peoplecounter import PeopleCounter
+	except ImportError as e:
+		raise SkipBenchmark(str(e))
+
+	net = cv2.dnn.readNetFromCaffe(
+		require(os.path.join(folder, "model", "MobileNetSSD_deploy.prototxt")),
+		require(os.path.join(folder, "model", "MobileNetSSD_deploy.caffemodel")))
+	paths = sorted(glob.glob(asset("11.- cv2.multi_obj_tracking", "videos",
+		"*.mp4")))
+	frames = []
+	for p in paths:
+		frames.extend([(p, i, f) for (i, f) in
+			enumerate(read_frames(p, opts["max_frames"]))])
+	state = {"counter": None}
+
+	def step(item):
+		(path, frameID, frame) = item
+
+		# start counting from scratch on every video
+		if frameID == 0:
+			state["counter"] = PeopleCounter(maxDisappeared=40, maxDistance=50)
+		counter = state["counter"]
+
+		frame = cv2.resize(frame, (500, int(frame.shape[0] * 500 / frame.shape[1])))
+		rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+		(H, W) = frame.shape[:2]
+		rects = []
+		found = 0
+
+		if frameID % 30 == 0:
+			blob = cv2.dnn.blobFromImage(frame, 0.007843, (W, H), 127.5)
+			net.setInput(blob)
+			detections = net.forward()
+			boxes = postprocess(detections, W, H, 0.4,
+				classes=[CLASSES.index("person")])["box"]
+			counter.startTrackers(rgb, boxes)
+			found = len(boxes)
+		else:
+			rects = counter.updateTrackers(rgb)
+
+		counter.update(rects, H)
+		return found
+
+	return (frames, step)
+
+# map every benchmark name to the function building its inputs and the
+# per-item step being timed
+BENCHMARKS = {
+	"haar_faces": bench_haar_faces,
+	"haar_cats": bench_haar_cats,
+	"haar_video": bench_haar_video,
+	"ssd_images": bench_ssd_images,
+	"multi_object_tracking": bench_multi_object_tracking,
+	"people_counter": bench_people_counter,
+}
+
+def peak_rss_mb():
+	# peak resident set size of this process, in megabytes
+	try:
+		import resource
+	except ImportError:
+		return None
+
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+def run_benchmark(name, opts, results):
+	# build the inputs of the benchmark, then time every step (the
+	# first `warmup` items are run but not timed)
+	try:
+		(items, step) = BENCHMARKS[name](opts)
+		if len(items) == 0:
+			raise SkipBenchmark("no input found")
+
+		for item in items[:opts["warmup"]]:
+			step(item)
+
+		latencies = []
+		detections = 0
+		start = time.perf_counter()
+		for r in range(0, opts["repeat"]):
+			for item in items:
+				t = time.perf_counter()
+				detections += step(item)
+				latencies.append(time.perf_counter() - t)
+		elapsed = time.perf_counter() - start
+
+	except SkipBenchmark as e:
+		results.put({"name": name, "skipped": str(e)})
+		return
+
+	# report any other error as a failed benchmark rather than leaving
+	# the parent waiting for a result
+	except Exception as e:
+		results.put({"name": name, "failed": "{}: {}".format(
+			type(e).__name__, e)})
+		return
+
+	latencies = np.array(latencies) * 1000.0
+	results.put({
+		"name": name,
+		"frames": len(latencies),
+		"fps": len(latencies) / elapsed,
+		"latency_ms": {
+			"mean": float(latencies.mean()),
+			"p50": float(np.percentile(latencies, 50)),
+			"p95": float(np.percentile(latencies, 95)),
+			"p99": float(np.percentile(latencies, 99)),
+		},
+		"peak_rss_mb": peak_rss_mb(),
+		"detections": int(detections) // opts["repeat"],
+	})
+
+def run_all(opts):
+	# run every benchmark in a fresh process so the peak RSS of one does
+	# not leak into the next one
+	report = {
+		"timestamp": time.time(),
+		"platform": platform.platform(),
+		"python": platform.python_version(),
+		"opencv": cv2.__version__,
+		"benchmarks": {},
+	}
+
+	for name in opts["only"] or list(BENCHMARKS.keys()):
+		print("[INFO] running {}...".format(name))
+		results = Queue()
+		p = Process(target=run_benchmark, args=(name, opts, results))
+		p.start()
+
+		# wait for the result, giving up if the process died without
+		# sending one (e.g. a crash inside OpenCV)
+		result = None
+		while result is None:
+			try:
+				result = results.get(timeout=1.0)
+			except Empty:
+				if not p.is_alive():
+					result = {"name": name, "failed": "exit code {}".format(
+						p.exitcode)}
+		p.join()
+
+		if "skipped" in result:
+			print("[INFO]   skipped: {}".format(result["skipped"]))
+		elif "failed" in result:
+			print("[INFO]   failed: {}".format(result["failed"]))
+		else:
+			print("[INFO]   {:.1f} FPS, p95 {:.2f} ms, {:.0f} MB, {} detections".format(
+				result["fps"], result["latency_ms"]["p95"],
+				result["peak_rss_mb"] or 0, result["detections"]))
+
+		report["benchmarks"][name] = result
+
+	return report
+
+def compare(basePath, newPath, threshold):
+	# load both runs and compare every benchmark present in both,
+	# flagging lower throughput or higher tail latency beyond the
+	# threshold (relative) along with any change in detection counts
+	base = json.loads(open(basePath).read())["benchmarks"]
+	new = json.loads(open(newPath).read())["benchmarks"]
+	regressions = 0
+
+	print("{:<24} {:>10} {:>10} {:>8} {:>10} {:>10} {:>8}  {}".format(
+		"benchmark", "base fps", "new fps", "change", "base p95", "new p95",
+		"change", "status"))
+	for name in base:
+		if name not in new or "fps" not in base[name]:
+			continue
+
+		# a benchmark which ran before but not anymore is a regression
+		if "fps" not in new[name]:
+			print("{:<24} {}".format(name, new[name].get("skipped",
+				new[name].get("failed"))))
+			regressions += 1
+			continue
+
+		(b, n) = (base[name], new[name])
+		fpsChange = n["fps"] / b["fps"] - 1.0
+		p95Change = n["latency_ms"]["p95"] / b["latency_ms"]["p95"] - 1.0
+		problems = []
+		if fpsChange < -threshold:
+			problems.append("slower")
+		if p95Change > threshold:
+			problems.append("p95 up")
+		if n["detections"] != b["detections"]:
+			problems.append("detections {} -> {}".format(b["detections"],
+				n["detections"]))
+		regressions += len(problems) > 0
+
+		print("{:<24} {:>10.1f} {:>10.1f} {:>+7.1f}% {:>10.2f} {:>10.2f} {:>+7.1f}%  {}".format(
+			name, b["fps"], n["fps"], fpsChange * 100, b["latency_ms"]["p95"],
+			n["latency_ms"]["p95"], p95Change * 100,
+			", ".join(problems) or "ok"))
+
+	return regressions
+
+# the benchmarks run in child processes which import this module, so
+# everything that actually runs lives under the main guard
+if __name__ == "__main__":
+	# construct the argument parser and parse the arguments
+	ap = argparse.ArgumentParser()
+	ap.add_argument("-o", "--output", type=str, help="path to the JSON file the results are written to")
+	ap.add_argument("--only", type=str, nargs="+", choices=list(BENCHMARKS.keys()), help="run only these benchmarks")
+	ap.add_argument("-r", "--repeat", type=int, default=1, help="# of passes over the inputs of every benchmark")
+	ap.add_argument("-w", "--warmup", type=int, default=1, help="# of untimed items run before timing")
+	ap.add_argument("--max-frames", type=int, default=300, help="maximum # of frames used from every video (0 for all)")
+	ap.add_argument("--no-gate", action="store_true", help="run the video face detector on every frame, without the motion gate")
+	add_profile_argument(ap)
+	ap.add_argument("-t", "--tracker", type=str, default="csrt", help="OpenCV tracker used by the multi object tracking benchmark")
+	ap.add_argument("-c", "--compare", type=str, nargs=2, metavar=("BASE", "NEW"), help="compare two result files instead of running")
+	ap.add_argument("--threshold", type=float, default=0.10, help="relative slowdown tolerated by --compare")
+	args = vars(ap.parse_args())
+
+	# compare two previous runs, failing if anything regressed
+	if args["compare"] is not None:
+		regressions = compare(args["compare"][0], args["compare"][1],
+			args["threshold"])
+		print("[INFO] {} regression(s)".format(regressions))
+		sys.exit(1 if regressions > 0 else 0)
+
+	# otherwise, run the benchmarks and save the results
+	report = run_all(args)
+	if args["output"] is not None:
+		os.makedirs(os.path.dirname(os.path.abspath(args["output"])),
+			exist_ok=True)
+		with open(args["output"], "w") as f:
+			json.dump(report, f, indent=2)
+		print("[INFO] results written to {}".format(args["output"]))
@@ -0,0 +1,257 @@
+# USAGE
+# Sweep the detectMultiScale parameters of every bundled cascade over the
+# bundled images and save the Pareto-optimal profiles the cascade scripts
+# load with --profile fast|balanced|accurate:
+# python benchmarks/tune_cascades.py
+# python benchmarks/tune_cascades.py --only haarcascade_frontalface_default.xml --max-dim 1280 --output results/profiles.json
+
+# import the necessary packages
+import numpy as np
+import argparse
+import json
+import glob
+import time
+import sys
+import os
+import cv2
+
+# the tuner runs from any directory, the assets are found relative to
+# the root of the repository
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from cvcommon.cascadeprofiles import PROFILES_PATH
+
+# the size eyes_tracking resizes the faces to before searching their eyes
+FACE_SIZE = 96
+
+# every tuned cascade along with the images it is tuned on: the eye
+# cascade is tuned on the (canonical size) faces found on the people
+# images, as eyes_tracking uses it
+CASCADES = {
+	"haarcascade_frontalface_default.xml": {
+		"cascade": ("05.- cv2.img_faces_detection", "classifiers"),
+		"images": [("05.- cv2.img_faces_detection", "images", "people-*.jpg")],
+		"videos": [("06.- cv2.video_faces_detection", "videos", "politics.mp4")],
+		"minSizes": [20, 30, 50]},
+	"haarcascade_frontalcatface.xml": {
+		"cascade": ("05.- cv2.img_faces_detection", "classifiers"),
+		"images": [("05.- cv2.img_faces_detection", "images", "cats-*.jpg")],
+		"minSizes": [20, 30, 50]},
+	"haarcascade_frontalcatface_extended.xml": {
+		"cascade": ("05.- cv2.img_faces_detection", "classifiers"),
+		"images": [("05.- cv2.img_faces_detection", "images", "cats-*.jpg")],
+		"minSizes": [20, 30, 50]},
+	"haarcascade_eye.xml": {
+		"cascade": ("08.- cv2.eyes_tracking", "classifiers"),
+		"faces": "haarcascade_frontalface_default.xml",
+		"minSizes": [10, 15, 20]},
+}
+
+def asset(*parts):
+	# build the absolute path of a bundled asset
+	return os.path.join(ROOT, *parts)
+
+def shrink(gray, maxDim):
+	# shrink the image if its longest side is bigger than `maxDim`
+	(h, w) = gray.shape[:2]
+	if maxDim is None or max(h, w) <= maxDim:
+		return gray
+
+	r = maxDim / float(max(h, w))
+	return cv2.resize(gray, (int(w * r), int(h * r)), interpolation=cv2.INTER_AREA)
+
+def load_images(spec, opts):
+	# load the grayscale images of the cascade along with a few frames
+	# spread over its videos
+	images = []
+	for pattern in spec.get("images", []):
+		for path in sorted(glob.glob(asset(*pattern))):
+			images.append(shrink(cv2.imread(path, cv2.IMREAD_GRAYSCALE),
+				opts["max_dim"]))
+
+	for parts in spec.get("videos", []):
+		video = cv2.VideoCapture(asset(*parts))
+		total = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+		for i in np.linspace(0, max(total - 1, 0), opts["frames"]).astype("int"):
+			video.set(cv2.CAP_PROP_POS_FRAMES, int(i))
+			(grabbed, frame) = video.read()
+			if grabbed:
+				images.append(shrink(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY),
+					opts["max_dim"]))
+		video.release()
+
+	return images
+
+def raw_hits(classifier, gray, scaleFactor, minSize):
+	# without neighbours detectMultiScale groups nothing and returns
+	# every raw hit -- grouping them afterwards with any number of
+	# neighbours gives the same boxes as detectMultiScale with it, so a
+	# single scan serves every minNeighbors value
+	start = time.time()
+	rects = classifier.detectMultiScale(gray, scaleFactor=scaleFactor,
+		minNeighbors=0, minSize=(minSize, minSize))
+	return (np.array(rects, dtype="int").reshape(-1, 4), time.time() - start)
+
+def group(rects, minNeighbors):
+	# group the raw hits as detectMultiScale does
+	(rects, _) = cv2.groupRectangles(rects.tolist(), minNeighbors, 0.2)
+	return np.array(rects, dtype="int").reshape(-1, 4)
+
+def iou(a, b):
+	# compute the intersection over union of every box of `a` with every
+	# box of `b` (all (x, y, w, h))
+	(a, b) = (a[:, None, :].astype("float"), b[None, :, :].astype("float"))
+	w = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - \
+		np.maximum(a[..., 0], b[..., 0])
+	h = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - \
+		np.maximum(a[..., 1], b[..., 1])
+	inter = np.clip(w, 0, None) * np.clip(h, 0, None)
+	return inter / (a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - inter)
+
+def matches(found, reference, threshold):
+	# greedily match the found boxes to the reference ones (best overlap
+	# first) and return the number of matches
+	if len(found) == 0 or len(reference) == 0:
+		return 0
+
+	overlaps = iou(found, reference)
+	matched = 0
+	while overlaps.max() >= threshold:
+		(i, j) = np.unravel_index(np.argmax(overlaps), overlaps.shape)
+		overlaps[i, :] = -1
+		overlaps[:, j] = -1
+		matched += 1
+
+	return matched
+
+def reference_detections(classifier, images, minSize, opts):
+	# there are no annotations, so the reference is what a very fine
+	# (and slow) scan finds
+	return [group(raw_hits(classifier, gray, opts["reference_scale"],
+		minSize)[0], opts["reference_neighbors"]) for gray in images]
+
+def face_crops(images, faces):
+	# resize every reference face to the canonical face size
+	return [cv2.resize(gray[y:y + h, x:x + w], (FACE_SIZE, FACE_SIZE),
+		interpolation=cv2.INTER_AREA)
+		for (gray, boxes) in zip(images, faces) for (x, y, w, h) in boxes]
+
+def sweep(classifier, images, reference, minSizes, opts):
+	# time every (scaleFactor, minSize) scan over the images once and
+	# score every minNeighbors value against the reference
+	points = []
+	expected = sum(len(r) for r in reference)
+	for scaleFactor in opts["scale_factors"]:
+		for minSize in minSizes:
+			scans = [raw_hits(classifier, gray, scaleFactor, minSize)
+				for gray in images]
+			scanTime = sum(t for (rects, t) in scans)
+
+			for minNeighbors in opts["neighbors"]:
+				start = time.time()
+				found = [group(rects, minNeighbors) for (rects, t) in scans]
+				elapsed = scanTime + time.time() - start
+
+				detections = sum(len(f) for f in found)
+				matched = sum(matches(f, r, opts["iou"])
+					for (f, r) in zip(found, reference))
+				recall = matched / float(max(expected, 1))
+				precision = matched / float(max(detections, 1))
+				f1 = 2 * recall * precision / max(recall + precision, 1e-6)
+				points.append({"scaleFactor": scaleFactor,
+					"minNeighbors": minNeighbors, "minSize": [minSize, minSize],
+					"msPerImage": round(1000.0 * elapsed / max(len(images), 1), 2),
+					"detections": detections, "recall": round(recall, 4),
+					"precision": round(precision, 4), "f1": round(f1, 4)})
+
+			print("[INFO] scaleFactor={} minSize={}: {:.1f} ms/image".format(
+				scaleFactor, minSize, 1000.0 * scanTime / max(len(images), 1)))
+
+	return points
+
+def pareto(points):
+	# keep the points no other point beats on both time and F1: sorted
+	# by time, every kept point has a better F1 than all faster ones
+	front = []
+	for p in sorted(points, key=lambda p: (p["msPerImage"], -p["f1"])):
+		if len(front) == 0 or p["f1"] > front[-1]["f1"]:
+			front.append(p)
+
+	return front
+
+def pick_profiles(front, opts):
+	# "accurate" is the best F1, "balanced" and "fast" the fastest points
+	# reaching a fraction of it
+	best = max(p["f1"] for p in front)
+	profiles = {"accurate": min((p for p in front if p["f1"] == best),
+		key=lambda p: p["msPerImage"])}
+	for (name, ratio) in (("balanced", opts["balanced"]), ("fast", opts["fast"])):
+		profiles[name] = next(p for p in front if p["f1"] >= ratio * best)
+
+	return profiles
+
+def tune(name, spec, opts, cache):
+	# load the cascade and the images it is tuned on
+	print("[INFO] tuning {}...".format(name))
+	classifier = cv2.CascadeClassifier(asset(*spec["cascade"] + (name,)))
+	if "faces" in spec:
+		(images, faces) = cache[spec["faces"]]
+		images = face_crops(images, faces)
+	else:
+		images = load_images(spec, opts)
+
+	# find the reference detections and sweep the parameters
+	reference = reference_detections(classifier, images, min(spec["minSizes"]),
+		opts)
+	cache[name] = (images, reference)
+	points = sweep(classifier, images, reference, spec["minSizes"], opts)
+	front = pareto(points)
+	return {"images": len(images), "reference": sum(len(r) for r in reference),
+		"profiles": pick_profiles(front, opts), "pareto": front}
+
+if __name__ == "__main__":
+	# construct the argument parse and parse the arguments
+	ap = argparse.ArgumentParser()
+	ap.add_argument("-o", "--output", type=str, default=PROFILES_PATH, help="path to the JSON file the profiles are written to")
+	ap.add_argument("--only", type=str, nargs="+", choices=list(CASCADES.keys()), help="tune only these cascades (the eye cascade needs the face one)")
+	ap.add_argument("--scale-factors", type=float, nargs="+", default=[1.05, 1.1, 1.2, 1.3, 1.5], help="scaleFactor values swept")
+	ap.add_argument("--neighbors", type=int, nargs="+", default=[3, 4, 5, 6, 8], help="minNeighbors values swept")
+	ap.add_argument("--reference-scale", type=float, default=1.02, help="scaleFactor of the reference scan")
+	ap.add_argument("--reference-neighbors", type=int, default=10, help="minNeighbors of the reference scan")
+	ap.add_argument("--iou", type=float, default=0.3, help="overlap above which a detection matches a reference one")
+	ap.add_argument("--balanced", type=float, default=0.9, help="fraction of the best F1 the balanced profile has to reach")
+	ap.add_argument("--fast", type=float, default=0.7, help="fraction of the best F1 the fast profile has to reach")
+	ap.add_argument("--max-dim", type=int, default=None, help="shrink the images whose longest side is bigger than this")
+	ap.add_argument("--frames", type=int, default=10, help="# of frames used from every video")
+	opts = vars(ap.parse_args())
+
+	# the scans time themselves, so keep OpenCV's own threads out of the
+	# way of the comparison
+	cv2.setNumThreads(1)
+
+	names = opts["only"] or list(CASCADES.keys())
+	if any("faces" in CASCADES[n] and CASCADES[n]["faces"] not in names
+		for n in names):
+		ap.error("the eye cascade is tuned on the faces of the face cascade")
+
+	cache = {}
+	results = {}
+	for name in CASCADES.keys():
+		if name in names:
+			results[name] = tune(name, CASCADES[name], opts, cache)
+			for (profile, p) in sorted(results[name]["profiles"].items()):
+				print("[INFO] {} {}: scaleFactor={} minNeighbors={} minSize={} "
+					"({:.1f} ms/image, F1 {:.2f})".format(name, profile,
+					p["scaleFactor"], p["minNeighbors"], p["minSize"][0],
+					p["msPerImage"], p["f1"]))
+
+	# write the profiles
+	settings = {k: opts[k] for k in ("scale_factors", "neighbors",
+		"reference_scale", "reference_neighbors", "iou", "balanced", "fast",
+		"max_dim", "frames")}
+	outputDir = os.path.dirname(os.path.abspath(opts["output"]))
+	os.makedirs(outputDir, exist_ok=True)
+	with open(opts["output"], "w") as f:
+		json.dump({"opencv": cv2.__version__, "settings": settings,
+			"cascades": results}, f, indent=2)
+	print("[INFO] profiles written to {}".format(opts["output"]))
@@ -0,0 +1,67 @@
+# import the necessary packages
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import cv2
+
+class InferenceFuture:
+	def __init__(self, frameID, future=None, pending=None):
+		# store the ID of the frame the inference belongs to along with
+		# either the future of the worker thread running it or the
+		# asynchronous array returned by `forwardAsync`
+		self.frameID = frameID
+		self.future = future
+		self.pending = pending
+
+	def done(self):
+		# check whether the output is ready without blocking
+		if self.future is not None:
+			return self.future.done()
+
+		return self.pending.wait_for(0)
+
+	def result(self):
+		# block until the output of the network is ready and return it
+		if self.future is not None:
+			return self.future.result()
+
+		return self.pending.get()
+
+class AsyncNet:
+	def __init__(self, net, backend=None, timer=None):
+		# store the network -- the Inference Engine backend runs the
+		# forward passes asynchronously on its own (`forwardAsync`), any
+		# other backend gets a worker thread (a network can only run one
+		# forward pass at a time, so a single one)
+		self.net = net
+
+		# store the optional stage timer (anything with a `time(stage)`
+		# context manager) the worker times the forward passes with --
+		# the native asynchronous passes can't be timed on their own
+		self.timer = timer
+		self.native = backend == cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE
+		self.executor = None
+		if not self.native:
+			self.executor = ThreadPoolExecutor(max_workers=1)
+
+	def run(self, blob):
+		# the forward pass run on the worker thread (which is the only
+		# one touching the network)
+		with self.timer.time("forward") if self.timer is not None \
+			else nullcontext():
+			self.net.setInput(blob)
+			return self.net.forward()
+
+	def submit(self, frameID, blob):
+		# start the forward pass of the blob and return right away with
+		# a future tagged with the frame ID
+		if self.native:
+			self.net.setInput(blob)
+			return InferenceFuture(frameID, pending=self.net.forwardAsync())
+
+		return InferenceFuture(frameID, future=self.executor.submit(self.run,
+			blob))
+
+	def close(self):
+		# wait for the forward passes in flight and stop the worker
+		if self.executor is not None:
+			self.executor.shutdown(wait=True)
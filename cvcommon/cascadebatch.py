@@ -0,0 +1,133 @@
+# import the necessary packages
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future
+from collections import deque
+import numpy as np
+import glob
+import json
+import time
+import cv2
+import os
+
+# the extensions of the files picked up when a directory is given
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# the cascade of a worker process along with its detectMultiScale
+# parameters (set by `init_worker`)
+classifier = None
+params = None
+
+def list_images(source):
+	# a directory is walked (in a stable order) for images, anything else
+	# is taken as a glob pattern
+	if os.path.isdir(source):
+		for (root, dirs, files) in os.walk(source):
+			dirs.sort()
+			for name in sorted(files):
+				if name.lower().endswith(IMAGE_EXTENSIONS):
+					yield os.path.join(root, name)
+	else:
+		for path in sorted(glob.iglob(source, recursive=True)):
+			if os.path.isfile(path):
+				yield path
+
+def load_gray(path, maxDim=None):
+	# decode the image straight to grayscale and, if it is bigger than
+	# `maxDim` on its longest side, shrink it -- returning the image
+	# along with the factor its boxes have to be scaled up by
+	gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+	if gray is None:
+		return (None, 1.0)
+
+	(h, w) = gray.shape[:2]
+	if maxDim is None or max(h, w) <= maxDim:
+		return (gray, 1.0)
+
+	r = maxDim / float(max(h, w))
+	gray = cv2.resize(gray, (max(1, int(w * r)), max(1, int(h * r))),
+		interpolation=cv2.INTER_AREA)
+	return (gray, 1.0 / r)
+
+def init_worker(cascadePath, detectParams):
+	# every worker process loads its own copy of the cascade once, and
+	# runs a single OpenCV thread (the processes are the parallelism)
+	global classifier, params
+	cv2.setNumThreads(1)
+	classifier = cv2.CascadeClassifier(cascadePath)
+	params = detectParams
+
+def detect(path, gray, scale):
+	# run the cascade on the (possibly shrunk) image and move the boxes
+	# back to the coordinates of the original image
+	boxes = np.array(classifier.detectMultiScale(gray, **params),
+		dtype="float").reshape(-1, 4)
+	boxes = np.round(boxes * scale).astype("int")
+	return {"path": path, "boxes": boxes.tolist(), "count": len(boxes)}
+
+def decoded(paths, ioWorkers, maxDim, ahead):
+	# decode the images on a pool of threads (the decoders release the
+	# GIL), keeping at most `ahead` of them decoded but not yet consumed
+	with ThreadPoolExecutor(max_workers=ioWorkers) as executor:
+		pending = deque()
+		for path in paths:
+			pending.append((path, executor.submit(load_gray, path, maxDim)))
+			if len(pending) >= ahead:
+				(p, future) = pending.popleft()
+				yield (p,) + future.result()
+
+		while len(pending) > 0:
+			(p, future) = pending.popleft()
+			yield (p,) + future.result()
+
+def run_cascade_batch(source, cascadePath, detectParams, output, workers=None,
+	ioWorkers=4, maxDim=None):
+	# open the JSON lines output file (one record per image)
+	workers = workers or os.cpu_count()
+	outputDir = os.path.dirname(os.path.abspath(output))
+	os.makedirs(outputDir, exist_ok=True)
+	f = open(output, "w")
+	(processed, failed, found) = (0, 0, 0)
+	start = time.time()
+
+	# stream the decoded images through the worker processes, keeping a
+	# few images per worker in flight and writing the records (in the
+	# order of the input) as soon as they come back
+	ahead = 2 * workers
+	with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+		initargs=(cascadePath, detectParams)) as executor:
+		inflight = deque()
+
+		def write(future):
+			nonlocal found
+			record = future.result()
+			found += record.get("count", 0)
+			f.write(json.dumps(record) + "\n")
+
+		for (path, gray, scale) in decoded(list_images(source), ioWorkers,
+			maxDim, ahead):
+			# an unreadable image gets an error record, in its place
+			processed += 1
+			if gray is None:
+				failed += 1
+				print("[WARN] {}: unreadable image".format(path))
+				future = Future()
+				future.set_result({"path": path, "error": "unreadable image"})
+			else:
+				future = executor.submit(detect, path, gray, scale)
+
+			inflight.append(future)
+			if len(inflight) >= ahead:
+				write(inflight.popleft())
+
+			# show the progress every thousand images or so
+			if processed % 1000 == 0:
+				print("[INFO] {} images processed ({:.1f} images/s)".format(
+					processed, processed / max(time.time() - start, 1e-6)))
+
+		while len(inflight) > 0:
+			write(inflight.popleft())
+
+	f.close()
+	print("[INFO] {} images ({} unreadable), {} detections in {:.1f}s".format(
+		processed, failed, found, time.time() - start))
@@ -0,0 +1,40 @@
+# import the necessary packages
+import json
+import os
+
+# the profiles written by benchmarks/tune_cascades.py: for every cascade
+# (by file name) the detectMultiScale parameters of each profile
+PROFILES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	"cascade_profiles.json")
+PROFILES = ("fast", "balanced", "accurate")
+
+def add_profile_argument(ap):
+	# add the --profile argument shared by the cascade scripts
+	ap.add_argument("-pr", "--profile", type=str, default=None,
+		choices=PROFILES,
+		help="use the tuned detectMultiScale parameters of this profile instead of the script's own")
+
+def load_profiles(path=PROFILES_PATH):
+	# load the cascades section of the profile file
+	with open(path) as f:
+		return json.load(f)["cascades"]
+
+def cascade_params(profile, cascadePath, defaults):
+	# return the detectMultiScale parameters (scaleFactor, minNeighbors
+	# and minSize) of the cascade for the profile, or the defaults when
+	# no profile was asked for
+	params = dict(defaults)
+	if profile is None:
+		return params
+
+	name = os.path.basename(cascadePath)
+	profiles = load_profiles()
+	if name not in profiles:
+		print("[WARN] no tuned profiles for {}, using the defaults".format(name))
+		return params
+
+	tuned = profiles[name]["profiles"][profile]
+	params.update({"scaleFactor": tuned["scaleFactor"],
+		"minNeighbors": tuned["minNeighbors"],
+		"minSize": tuple(tuned["minSize"])})
+	return params
@@ -0,0 +1,104 @@
+# import the necessary packages
+import numpy as np
+
+class CascadeTracker:
+	def __init__(self, classifier, scaleFactor=1.1, minNeighbors=5,
+		minSize=(30, 30), fullEvery=10, expand=0.5, sizeChange=0.3):
+		# store the cascade along with the parameters of the full scans
+		self.classifier = classifier
+		self.scaleFactor = scaleFactor
+		self.minNeighbors = minNeighbors
+		self.minSize = minSize
+
+		# store how often (in frames) the whole frame is scanned, how
+		# much the window around a known object is grown (as a fraction
+		# of its size, on every side) and how much its size may change
+		# from one frame to the next
+		self.fullEvery = fullEvery
+		self.expand = expand
+		self.sizeChange = sizeChange
+
+		# initialize the last known (x, y, w, h) boxes and the number of
+		# frames since the last full scan
+		self.boxes = np.zeros((0, 4), dtype="int")
+		self.sinceFull = 0
+
+		# initialize the number of full scans and of tracked frames
+		self.fullScans = 0
+		self.tracked = 0
+
+	def scan(self, gray):
+		# scan the whole frame
+		self.fullScans += 1
+		self.sinceFull = 0
+		self.boxes = np.array(self.classifier.detectMultiScale(gray,
+			scaleFactor=self.scaleFactor, minNeighbors=self.minNeighbors,
+			minSize=self.minSize), dtype="int").reshape(-1, 4)
+		return self.boxes
+
+	def search(self, gray, box):
+		# search a window around the box for an object of about the same
+		# size, returning the one closest to the box (or None when the
+		# object was lost)
+		(H, W) = gray.shape[:2]
+		(x, y, w, h) = box
+		(dx, dy) = (int(w * self.expand), int(h * self.expand))
+		(x1, y1) = (max(0, x - dx), max(0, y - dy))
+		(x2, y2) = (min(W, x + w + dx), min(H, y + h + dy))
+
+		minSize = (max(self.minSize[0], int(w / (1.0 + self.sizeChange))),
+			max(self.minSize[1], int(h / (1.0 + self.sizeChange))))
+		maxSize = (int(w * (1.0 + self.sizeChange)) + 1,
+			int(h * (1.0 + self.sizeChange)) + 1)
+		found = np.array(self.classifier.detectMultiScale(gray[y1:y2, x1:x2],
+			scaleFactor=self.scaleFactor, minNeighbors=self.minNeighbors,
+			minSize=minSize, maxSize=maxSize), dtype="int").reshape(-1, 4)
+		if len(found) == 0:
+			return None
+
+		# move the candidates to frame coordinates and keep the closest
+		found[:, 0:2] += (x1, y1)
+		centers = found[:, 0:2] + found[:, 2:4] / 2.0
+		d = np.linalg.norm(centers - (x + w / 2.0, y + h / 2.0), axis=1)
+		return found[np.argmin(d)]
+
+	def detect(self, gray):
+		# scan the whole frame every `fullEvery` frames or when nothing
+		# is being tracked
+		if self.fullEvery <= 1 or len(self.boxes) == 0 or \
+			self.sinceFull + 1 >= self.fullEvery:
+			return self.scan(gray)
+
+		# otherwise, only look around the known objects -- losing any of
+		# them means it (or a new one) has to be found on the whole frame
+		boxes = []
+		for box in self.boxes:
+			found = self.search(gray, box)
+			if found is None:
+				return self.scan(gray)
+
+			# two windows may lock on the same object, keep it once
+			if not any(self.overlaps(found, b) for b in boxes):
+				boxes.append(found)
+
+		self.tracked += 1
+		self.sinceFull += 1
+		self.boxes = np.array(boxes, dtype="int").reshape(-1, 4)
+		return self.boxes
+
+	@staticmethod
+	def overlaps(a, b, threshold=0.5):
+		# check whether the intersection over union of two (x, y, w, h)
+		# boxes is above the threshold
+		w = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+		h = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+		if w <= 0 or h <= 0:
+			return False
+
+		inter = float(w * h)
+		return inter / (a[2] * a[3] + b[2] * b[3] - inter) > threshold
+
+	def report(self):
+		# describe how many frames only searched around the known objects
+		return "{} full scans, {} tracked frames".format(self.fullScans,
+			self.tracked)
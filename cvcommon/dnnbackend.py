@@ -0,0 +1,164 @@
+# import the necessary packages
+from threading import Lock
+import numpy as np
+import json
+import time
+import os
+import cv2
+
+# the backends and targets which can be picked from the command line
+# (the ones missing from this OpenCV build are left out)
+BACKENDS = {
+	"default": cv2.dnn.DNN_BACKEND_DEFAULT,
+	"opencv": cv2.dnn.DNN_BACKEND_OPENCV,
+	"inference-engine": cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE,
+}
+TARGETS = dict((name, getattr(cv2.dnn, attr)) for (name, attr) in (
+	("cpu", "DNN_TARGET_CPU"), ("cpu-fp16", "DNN_TARGET_CPU_FP16"),
+	("opencl", "DNN_TARGET_OPENCL"), ("opencl-fp16", "DNN_TARGET_OPENCL_FP16"))
+	if hasattr(cv2.dnn, attr))
+
+# the targets the self-benchmark chooses from
+CPU_TARGETS = [t for t in ("cpu", "cpu-fp16") if t in TARGETS]
+
+# the file the self-benchmark results are cached in, shared by every
+# script
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "cvcommon",
+	"dnnbackend.json")
+cacheLock = Lock()
+
+def add_dnn_arguments(ap):
+	# add the options selecting how the networks run to a script's
+	# argument parser
+	ap.add_argument("--dnn-backend", type=str, default="default",
+		choices=["auto"] + list(BACKENDS.keys()),
+		help="DNN backend (auto benchmarks the CPU configurations once and caches the fastest)")
+	ap.add_argument("--dnn-target", type=str, default=None,
+		choices=list(TARGETS.keys()),
+		help="DNN target device (cpu by default, auto only benchmarks this target when given)")
+	ap.add_argument("--dnn-threads", type=int, default=0,
+		help="# of threads used by OpenCV (0 keeps OpenCV's default)")
+
+def available(backend, target):
+	# check whether this OpenCV build can run the backend on the target
+	if backend == "default":
+		backend = "opencv"
+	try:
+		return TARGETS[target] in cv2.dnn.getAvailableTargets(BACKENDS[backend])
+	except cv2.error:
+		return False
+
+def time_config(model, config, shape, backend, target, threads, runs=10):
+	# load a fresh copy of the network with the given configuration and
+	# return the median time of a forward pass (after a warm-up one)
+	cv2.setNumThreads(threads)
+	net = cv2.dnn.readNet(model, config)
+	net.setPreferableBackend(BACKENDS[backend])
+	net.setPreferableTarget(TARGETS[target])
+	blob = np.random.RandomState(42).uniform(0, 1, size=shape).astype("float32")
+	net.setInput(blob)
+	net.forward()
+
+	timings = []
+	for i in range(0, runs):
+		start = time.perf_counter()
+		net.setInput(blob)
+		net.forward()
+		timings.append(time.perf_counter() - start)
+
+	return float(np.median(timings))
+
+def cache_key(model, config, shape, targets):
+	# the choice only holds for the same files, input size, targets
+	# benchmarked, OpenCV version and machine
+	files = [os.path.abspath(p) for p in (model, config) if p]
+	stamps = ["{}:{}".format(os.path.getsize(p), int(os.path.getmtime(p)))
+		for p in files]
+	return "|".join(files + stamps + ["x".join(str(v) for v in shape),
+		",".join(targets), cv2.__version__, str(os.cpu_count())])
+
+def load_cache():
+	try:
+		with open(CACHE_PATH) as f:
+			return json.load(f)
+	except (IOError, ValueError):
+		return {}
+
+def autotune(model, config, shape, targets=CPU_TARGETS):
+	# reuse the previous choice for this network if there is one
+	key = cache_key(model, config, shape, targets)
+	with cacheLock:
+		choice = load_cache().get(key)
+	if choice is not None:
+		return choice
+
+	# otherwise, time every available backend on the targets (the CPU
+	# ones unless a target was asked for) with a few thread counts and
+	# keep the fastest configuration
+	print("[INFO] benchmarking the DNN backends for {}...".format(
+		os.path.basename(model)))
+	cpus = os.cpu_count() or 1
+	threadCounts = sorted(set([1, max(1, cpus // 2), cpus]))
+	defaultThreads = cv2.getNumThreads()
+	choice = None
+
+	for backend in ("opencv", "inference-engine"):
+		for target in targets:
+			if not available(backend, target):
+				continue
+
+			for threads in threadCounts:
+				try:
+					elapsed = time_config(model, config, shape, backend,
+						target, threads)
+				except cv2.error:
+					continue
+
+				print("[INFO]   {}/{} with {} thread(s): {:.2f} ms".format(
+					backend, target, threads, elapsed * 1000.0))
+				if choice is None or elapsed < choice["time"]:
+					choice = {"backend": backend, "target": target,
+						"threads": threads, "time": elapsed}
+
+	cv2.setNumThreads(defaultThreads)
+	if choice is None:
+		if targets != CPU_TARGETS:
+			raise ValueError("no DNN backend can run the {} target".format(
+				", ".join(targets)))
+		return {"backend": "default", "target": "cpu", "threads": 0}
+
+	# remember the choice for the next runs
+	with cacheLock:
+		cache = load_cache()
+		cache[key] = choice
+		os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+		with open(CACHE_PATH, "w") as f:
+			json.dump(cache, f, indent=2)
+
+	return choice
+
+def select_backend(args, model, config="", shape=(1, 3, 300, 300)):
+	# resolve the backend, target and threads requested on the command
+	# line (benchmarking them if asked to), apply the thread count and
+	# return the backend and target the network is set up with along
+	# with the thread count (0 if OpenCV's default is kept)
+	if args["dnn_backend"] == "auto":
+		targets = CPU_TARGETS if args["dnn_target"] is None else \
+			[args["dnn_target"]]
+		choice = autotune(model, config, shape, targets)
+		(backend, target, threads) = (choice["backend"], choice["target"],
+			args["dnn_threads"] or choice["threads"])
+		print("[INFO] using the {}/{} DNN backend with {} thread(s)".format(
+			backend, target, threads or cv2.getNumThreads()))
+	else:
+		(backend, target, threads) = (args["dnn_backend"],
+			args["dnn_target"] or "cpu", args["dnn_threads"])
+		if not available(backend, target):
+			print("[WARN] the {}/{} DNN backend isn't available, using the default one".format(
+				backend, target))
+			(backend, target) = ("default", "cpu")
+
+	if threads > 0:
+		cv2.setNumThreads(threads)
+
+	return (BACKENDS[backend], TARGETS[target], threads)
@@ -0,0 +1,95 @@
+# import the necessary packages
+from collections import OrderedDict
+from threading import Lock
+import numpy as np
+import os
+import cv2
+
+class ModelRegistry:
+	def __init__(self, maxModels=8):
+		# store the maximum number of networks kept loaded at once --
+		# when the registry is full the least recently used network is
+		# dropped
+		self.maxModels = maxModels
+
+		# initialize the loaded networks (keyed by their files, instance
+		# number, backend and target, oldest use first), the lock guarding them
+		# and the number of cache hits and misses
+		self.nets = OrderedDict()
+		self.lock = Lock()
+		self.hits = 0
+		self.misses = 0
+
+	def key(self, model, config, framework, instance, backend, target):
+		# the same files reached through different relative paths are
+		# the same network (but not on a different backend or target)
+		config = os.path.abspath(config) if config else ""
+		return (os.path.abspath(model), config, framework, instance, backend,
+			target)
+
+	def load(self, model, config="", framework="", warmup=None, instance=0,
+		backend=None, target=None):
+		# a network can only run one forward pass at a time, so callers
+		# needing several copies of the same network (e.g. one per
+		# worker thread) ask for different instances
+		key = self.key(model, config, framework, instance, backend, target)
+
+		with self.lock:
+			# return the network if it is already loaded, marking it as
+			# the most recently used one
+			net = self.nets.get(key)
+			if net is not None:
+				self.nets.move_to_end(key)
+				self.hits += 1
+				return net
+
+			self.misses += 1
+
+		# parse the network from disk (outside of the lock, this is the
+		# slow part) and run a first forward pass so the first real
+		# frame doesn't pay for the lazy initialization of the layers
+		net = cv2.dnn.readNet(model, config, framework)
+		if backend is not None:
+			net.setPreferableBackend(backend)
+		if target is not None:
+			net.setPreferableTarget(target)
+		if warmup is not None:
+			self.warmUp(net, warmup)
+
+		with self.lock:
+			# another thread may have loaded the same network in the
+			# meantime, in which case we keep theirs
+			if key in self.nets:
+				self.nets.move_to_end(key)
+				return self.nets[key]
+
+			# add the network, dropping the least recently used ones
+			# if the registry is full
+			self.nets[key] = net
+			while len(self.nets) > self.maxModels:
+				self.nets.popitem(last=False)
+
+		return net
+
+	def warmUp(self, net, shape):
+		# pass a blank blob of the given (N, C, H, W) shape through the
+		# network, which allocates its buffers and picks its kernels
+		net.setInput(np.zeros(shape, dtype="float32"))
+		net.forward()
+
+	def evict(self, model, config="", framework="", instance=0, backend=None,
+		target=None):
+		# drop a network from the registry (e.g. after its files changed)
+		with self.lock:
+			self.nets.pop(self.key(model, config, framework, instance, backend,
+				target), None)
+
+	def clear(self):
+		with self.lock:
+			self.nets.clear()
+
+	def __len__(self):
+		return len(self.nets)
+
+# the registry shared by everything running in this process
+registry = ModelRegistry()
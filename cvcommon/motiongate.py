@@ -0,0 +1,139 @@
+# import the necessary packages
+import numpy as np
+import cv2
+
+class MotionGate:
+	def __init__(self, width=160, threshold=25, minChange=0.002,
+		maxChange=0.3, padding=0.1, maxStatic=30, partial=True):
+		# store the width of the thumbnails the frames are compared on
+		# and the grayscale difference above which a pixel changed
+		self.width = width
+		self.threshold = threshold
+
+		# store the fraction of changed pixels below which the scene is
+		# static (the previous detections are reused) and above which
+		# the whole frame is searched again (rather than the changed
+		# regions only), how much the changed regions are grown (as a
+		# fraction of the frame size) so they hold whole objects, and the
+		# maximum number of frames detections are reused for
+		self.minChange = minChange
+		self.maxChange = maxChange
+		self.padding = padding
+		self.maxStatic = maxStatic
+
+		# the changed regions are searched on their own (as crops of the
+		# frame) only if the detector allows it, otherwise any motion
+		# means a search of the whole frame
+		self.partial = partial
+
+		# initialize the thumbnail of the frame the current detections
+		# come from, the detections themselves and the number of frames
+		# since the last full detection
+		self.reference = None
+		self.boxes = np.zeros((0, 4), dtype="int")
+		self.sinceFull = 0
+
+		# initialize the number of frames seen, skipped (previous
+		# detections reused) and only searched partially
+		self.frames = 0
+		self.skipped = 0
+		self.searchedPartially = 0
+
+	def thumbnail(self, gray):
+		# shrink (and blur) the frame so the comparison is cheap and
+		# insensitive to noise
+		(h, w) = gray.shape[:2]
+		thumb = cv2.resize(gray, (self.width, max(1, int(h * self.width / w))),
+			interpolation=cv2.INTER_AREA)
+		return cv2.GaussianBlur(thumb, (5, 5), 0)
+
+	def changedRegions(self, thumb, W, H):
+		# find the pixels which changed since the reference frame and
+		# return the fraction of them along with the (x, y, w, h)
+		# bounding boxes of the changed blobs in frame coordinates
+		mask = cv2.threshold(cv2.absdiff(thumb, self.reference),
+			self.threshold, 255, cv2.THRESH_BINARY)[1]
+		change = cv2.countNonZero(mask) / float(mask.size)
+		if change < self.minChange:
+			return (change, [])
+
+		mask = cv2.dilate(mask, None, iterations=2)
+		contours = cv2.findContours(mask, cv2.RETR_EXTERNAL,
+			cv2.CHAIN_APPROX_SIMPLE)[-2]
+
+		# scale every blob up to the frame and grow it by the padding
+		scale = W / float(thumb.shape[1])
+		pad = int(self.padding * max(W, H))
+		regions = []
+		for c in contours:
+			(x, y, w, h) = [int(v * scale) for v in cv2.boundingRect(c)]
+			(x1, y1) = (max(0, x - pad), max(0, y - pad))
+			(x2, y2) = (min(W, x + w + pad), min(H, y + h + pad))
+			regions.append((x1, y1, x2 - x1, y2 - y1))
+
+		return (change, regions)
+
+	def detect(self, gray, detector):
+		# `detector` takes a grayscale image and returns the (x, y, w, h)
+		# boxes found on it
+		(H, W) = gray.shape[:2]
+		thumb = self.thumbnail(gray)
+		self.frames += 1
+
+		# search the whole frame on the first frame, after a change of
+		# size, when the scene changed a lot or when the detections have
+		# been reused for too long
+		change = 1.0
+		regions = []
+		if self.reference is not None and self.reference.shape == thumb.shape \
+			and self.sinceFull < self.maxStatic:
+			(change, regions) = self.changedRegions(thumb, W, H)
+
+		if change >= self.maxChange or (len(regions) == 0 and
+			change >= self.minChange) or (len(regions) > 0 and
+			not self.partial):
+			self.boxes = np.array(detector(gray), dtype="int").reshape(-1, 4)
+			self.reference = thumb
+			self.sinceFull = 0
+			return self.boxes
+
+		self.sinceFull += 1
+
+		# nothing moved: reuse the previous detections
+		if len(regions) == 0:
+			self.skipped += 1
+			return self.boxes
+
+		# otherwise, only search the changed regions, keeping the
+		# previous detections whose center lies outside all of them
+		self.searchedPartially += 1
+		found = []
+		for (x, y, w, h) in regions:
+			for (bx, by, bw, bh) in detector(gray[y:y + h, x:x + w]):
+				found.append((bx + x, by + y, bw, bh))
+
+		centers = self.boxes[:, 0:2] + self.boxes[:, 2:4] // 2
+		inside = np.zeros(len(self.boxes), dtype="bool")
+		for (x, y, w, h) in regions:
+			inside |= (centers[:, 0] >= x) & (centers[:, 0] < x + w) & \
+				(centers[:, 1] >= y) & (centers[:, 1] < y + h)
+
+		# merge the duplicates found by overlapping regions
+		boxes = np.vstack([self.boxes[~inside],
+			np.array(found, dtype="int").reshape(-1, 4)])
+		if len(regions) > 1 and len(found) > 1:
+			boxes = np.array(cv2.groupRectangles(
+				np.repeat(boxes, 2, axis=0).tolist(), 1, 0.2)[0],
+				dtype="int").reshape(-1, 4)
+
+		# the changed regions were searched, so this frame becomes the
+		# reference for the next ones
+		self.boxes = boxes
+		self.reference = thumb
+		return self.boxes
+
+	def report(self):
+		# describe how much work the gate saved
+		return "{} frames, {} skipped ({:.1f}%), {} searched partially".format(
+			self.frames, self.skipped,
+			100.0 * self.skipped / max(1, self.frames), self.searchedPartially)
@@ -0,0 +1,67 @@
+# import the necessary packages
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import threading
+import cv2
+
+class MultiCascade:
+	def __init__(self, workers=4):
+		# initialize the cascades, by label, along with the pool of
+		# threads running them -- a cascade can't be used by two threads
+		# at once, so every thread loads its own copy of each of them
+		self.cascades = OrderedDict()
+		self.executor = ThreadPoolExecutor(max_workers=max(1, workers))
+		self.local = threading.local()
+
+	def add(self, label, path, scaleFactor=1.1, minNeighbors=3,
+		minSize=(30, 30), maxSize=None):
+		# load the cascade once to check the file, and store the
+		# detectMultiScale parameters it is run with
+		if cv2.CascadeClassifier(path).empty():
+			raise ValueError("could not load the cascade {}".format(path))
+
+		params = {"scaleFactor": scaleFactor, "minNeighbors": minNeighbors,
+			"minSize": tuple(minSize)}
+		if maxSize is not None:
+			params["maxSize"] = tuple(maxSize)
+		self.cascades[label] = {"path": path, "params": params}
+
+	def cascade(self, label):
+		# return the copy of the cascade owned by the calling thread
+		if not hasattr(self.local, "cascades"):
+			self.local.cascades = {}
+
+		if label not in self.local.cascades:
+			self.local.cascades[label] = cv2.CascadeClassifier(
+				self.cascades[label]["path"])
+
+		return self.local.cascades[label]
+
+	def scan(self, label, gray):
+		# run the cascade exactly as a detectMultiScale call of its own
+		# would (OpenCV doesn't expose the integral images or feature
+		# evaluation of a cascade, so they can't be shared between
+		# cascades without changing the detections)
+		return self.cascade(label).detectMultiScale(gray,
+			**self.cascades[label]["params"])
+
+	def detect(self, gray, labels=None):
+		# run every cascade (or the ones asked for) on the same
+		# grayscale image at once, one per thread -- detectMultiScale
+		# releases the GIL, so they overlap on the cores OpenCV's own
+		# threads leave idle
+		labels = list(self.cascades.keys()) if labels is None else labels
+		tasks = [(label, self.executor.submit(self.scan, label, gray))
+			for label in labels]
+
+		# return the (label, (x, y, w, h)) detections, in label order
+		found = []
+		for (label, future) in tasks:
+			found.extend((label, tuple(int(v) for v in r))
+				for r in future.result())
+
+		return found
+
+	def close(self):
+		# stop the threads
+		self.executor.shutdown(wait=True)
@@ -0,0 +1,61 @@
+# import the necessary packages
+import numpy as np
+import cv2
+
+# every detection kept by `postprocess` is one record of this type: the
+# index of the image (in a multi-image blob) it was found on, its class
+# and confidence, and its (startX, startY, endX, endY) box in pixels
+DETECTION = np.dtype([("image", "int32"), ("classID", "int32"),
+	("confidence", "float32"), ("box", "int32", (4,))])
+
+def nms(boxes, confidences, classIDs, minConfidence, threshold):
+	# shift the boxes of every class to their own region of the plane
+	# so boxes of different classes never overlap, then run non-maxima
+	# suppression over all of them at once
+	if len(boxes) == 0:
+		return np.zeros((0,), dtype="int")
+
+	boxes = np.asarray(boxes, dtype="float")
+	offsets = np.asarray(classIDs, dtype="float")[:, None] * \
+		(boxes[:, 2:4].max() + 1)
+	shifted = boxes + offsets
+	rects = np.hstack([shifted[:, 0:2], shifted[:, 2:4] - shifted[:, 0:2]])
+	idxs = cv2.dnn.NMSBoxes(rects.tolist(), np.asarray(confidences).tolist(),
+		minConfidence, threshold)
+
+	# return the indexes of the boxes we keep
+	return np.array(idxs, dtype="int").flatten()
+
+def postprocess(detections, W, H, minConfidence, classes=None,
+	nmsThreshold=None, clip=False, inclusive=False):
+	# flatten the (1, 1, N, 7) output of an SSD detection layer into
+	# one (image, classID, confidence, x1, y1, x2, y2) row per detection
+	rows = detections.reshape(-1, 7)
+
+	# keep the confident detections of the classes we care about
+	# (above the minimum confidence, or at least at it if `inclusive`)
+	keep = rows[:, 2] >= minConfidence if inclusive else \
+		rows[:, 2] > minConfidence
+	if classes is not None:
+		keep &= np.isin(rows[:, 1], classes)
+	rows = rows[keep]
+
+	# scale the (relative) boxes to the image size, clipping them to
+	# the image if the caller crops it with them (the network can put
+	# a box partly outside of the image)
+	boxes = rows[:, 3:7] * np.array([W, H, W, H], dtype="float32")
+	if clip:
+		boxes = np.clip(boxes, 0, [W - 1, H - 1, W - 1, H - 1])
+
+	# merge the overlapping boxes of the same class (if asked to)
+	if nmsThreshold is not None:
+		idxs = nms(boxes, rows[:, 2], rows[:, 1], minConfidence, nmsThreshold)
+		(rows, boxes) = (rows[idxs], boxes[idxs])
+
+	# pack everything in a structured array
+	found = np.empty(len(rows), dtype=DETECTION)
+	found["image"] = rows[:, 0]
+	found["classID"] = rows[:, 1]
+	found["confidence"] = rows[:, 2]
+	found["box"] = boxes.astype("int32")
+	return found
@@ -0,0 +1,132 @@
+# import the necessary packages
+from cvcommon.postprocess import DETECTION
+from cvcommon.postprocess import postprocess
+import numpy as np
+import cv2
+
+def parse_polygon(text):
+	# parse a polygon written as "x1,y1 x2,y2 x3,y3 ..." (in pixels of
+	# the original frame)
+	points = [[int(float(v)) for v in p.split(",")] for p in text.split()]
+	if len(points) < 3 or any(len(p) != 2 for p in points):
+		raise ValueError("a polygon needs at least three x,y points")
+
+	return np.array(points, dtype="int32")
+
+class TiledDetector:
+	def __init__(self, tileSize=600, overlap=0.2, roi=None, includeFull=True,
+		inputSize=(300, 300), scale=0.007843, mean=127.5, nmsThreshold=0.4):
+		# store the size (in pixels of the original frame) of the square
+		# tiles, how much two neighbouring tiles overlap (as a fraction
+		# of the tile size) and the optional polygon outside of which
+		# tiles are skipped -- the whole frame can also be passed as one
+		# more tile so that objects bigger than a tile are still found
+		self.tileSize = tileSize
+		self.overlap = overlap
+		self.roi = roi
+		self.includeFull = includeFull
+
+		# store the input size and normalization of the network along
+		# with the overlap above which two boxes of the same class are
+		# merged
+		self.inputSize = inputSize
+		self.scale = scale
+		self.mean = mean
+		self.nmsThreshold = nmsThreshold
+
+		# the tiles only depend on the frame size, so they are computed
+		# once per size, and some networks can't take a multi-image
+		# blob, in which case the tiles go one by one
+		self.cache = {}
+		self.batched = True
+
+	def positions(self, length):
+		# the offsets of the tiles along one axis: evenly spread so the
+		# first tile starts at 0, the last one ends at the border and
+		# neighbours overlap at least by `overlap`
+		size = min(self.tileSize, length)
+		if size == length:
+			return (np.array([0]), size)
+
+		stride = size * (1.0 - self.overlap)
+		n = int(np.ceil((length - size) / stride)) + 1
+		return (np.round(np.linspace(0, length - size, n)).astype("int"), size)
+
+	def tiles(self, W, H):
+		# return the cached tiles for this frame size if we have them
+		if (W, H) in self.cache:
+			return self.cache[(W, H)]
+
+		# build the grid of (x, y, w, h) tiles covering the frame
+		(xs, w) = self.positions(W)
+		(ys, h) = self.positions(H)
+		tiles = [(x, y, w, h) for y in ys for x in xs]
+
+		# only keep the tiles intersecting the region of interest (if
+		# any), checked against a mask of the polygon
+		if self.roi is not None:
+			mask = np.zeros((H, W), dtype="uint8")
+			cv2.fillPoly(mask, [self.roi], 255)
+			tiles = [(x, y, w, h) for (x, y, w, h) in tiles
+				if mask[y:y + h, x:x + w].any()]
+
+		# add the whole frame unless it is a single tile already
+		if self.includeFull and (len(tiles) != 1 or tiles[0] != (0, 0, W, H)):
+			tiles.append((0, 0, W, H))
+
+		self.cache[(W, H)] = np.array(tiles, dtype="int").reshape(-1, 4)
+		return self.cache[(W, H)]
+
+	def forward(self, net, crops):
+		# pass all the tiles through the network at once -- the first
+		# column of every detection is the index of its tile
+		if self.batched:
+			try:
+				net.setInput(cv2.dnn.blobFromImages(crops, self.scale,
+					self.inputSize, self.mean))
+				return net.forward()[0, 0]
+			except cv2.error:
+				self.batched = False
+
+		detections = []
+		for (i, crop) in enumerate(crops):
+			net.setInput(cv2.dnn.blobFromImage(crop, self.scale,
+				self.inputSize, self.mean))
+			d = net.forward()[0, 0].copy()
+			d[:, 0] = i
+			detections.append(d)
+
+		return np.concatenate(detections)
+
+	def detect(self, net, image, minConfidence, classes=None):
+		# crop the tiles of the frame (as views, no copy) and run them
+		# through the network
+		(H, W) = image.shape[:2]
+		tiles = self.tiles(W, H)
+		if len(tiles) == 0:
+			return np.zeros((0,), dtype=DETECTION)
+
+		crops = [image[y:y + h, x:x + w] for (x, y, w, h) in tiles]
+		detections = self.forward(net, crops)
+
+		# move the boxes from tile coordinates to frame coordinates
+		# (both relative to the size of the tile or frame, as the
+		# network outputs them)
+		t = tiles[detections[:, 0].astype("int")].astype("float32")
+		size = np.array([W, H, W, H], dtype="float32")
+		detections[:, 3:7] = (detections[:, 3:7] * np.hstack([t[:, 2:4],
+			t[:, 2:4]]) + np.hstack([t[:, 0:2], t[:, 0:2]])) / size
+		detections[:, 0] = 0
+
+		# drop the boxes whose center falls outside of the region of
+		# interest
+		if self.roi is not None and len(detections) > 0:
+			centers = (detections[:, 3:5] + detections[:, 5:7]) / 2.0 * size[:2]
+			inside = [cv2.pointPolygonTest(self.roi, (float(x), float(y)),
+				False) >= 0 for (x, y) in centers]
+			detections = detections[np.array(inside, dtype="bool")]
+
+		# filter and scale the detections, merging the duplicates found
+		# by overlapping tiles with non-maxima suppression
+		return postprocess(detections, W, H, minConfidence, classes=classes,
+			nmsThreshold=self.nmsThreshold, clip=True)